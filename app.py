@@ -1,87 +1,854 @@
 import os
 import re
+import sys
+import copy
+import asyncio
+import hashlib
+import io
+import csv
 import json
-from typing import Dict, List
-from fuzzywuzzy import fuzz, process
+import heapq
+import ctypes
+import mmap
+import select
+import time
+import argparse
+import threading
+import contextlib
+from array import array
+from bisect import bisect_right
+from collections import Counter, OrderedDict
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+from fractions import Fraction
+from functools import lru_cache, wraps
+from http import HTTPStatus
+from typing import Dict, Iterable, List, TextIO
+from urllib.parse import parse_qs, urlsplit
+from fuzzywuzzy import fuzz, process, utils
 
-class DropParser:
+INDEX_VERSION = 2
+
+RANDOM_BRANCH_PATTERN = re.compile(r'(?:else\s*)?if\s*\(\$random\s*<\s*(\d+)\)')
+RANDOM_CONDITION_PATTERN = re.compile(r'if\s*\(\$random\s*<\s*(\d+)\)')
+OBJ_ADD_PATTERN = re.compile(r'obj_add\(npc_coord,\s*([^,]+)(?:,\s*([^,]+))?(?:,\s*\^lootdrop_duration\))?')
+CALC_QUANTITY_PATTERN = re.compile(r'calc\(random\((\d+)\)\s*\+\s*(\d+)\)')
+PROC_HEADER_PATTERN = re.compile(r'\[proc,([^\]]+)\]\(\)\(namedobj, int\)')
+EARLY_RETURN_PATTERN = re.compile(r'if\s*\(map_members\s*=\s*false\)\s*\{\s*return\s*\(([^,]+),\s*([^)]+)\);')
+RANDOM_DEF_PATTERN = re.compile(r'\$random\s*=\s*random\((\d+)\);')
+RETURN_PATTERN = re.compile(r'return\s*\(([^,]+),\s*([^)]+)\);')
+PROC_RETURN_PATTERN = re.compile(r'return\s*\(~([^\)]+)\);')
+SWITCH_PATTERN = re.compile(r'switch_int\s*\(random\((\d+)\)\)\s*\{([^}]+)\}')
+CASE_PATTERN = re.compile(r'case\s*\d+\s*:\s*return\s*\(([^,]+),\s*([^)]+)\);')
+DEFAULT_CASE_PATTERN = re.compile(r'case\s*default\s*:\s*return\s*\(([^,]+),\s*([^)]+)\);')
+MEMBERS_MARKER = 'map_members = true'
+DEATH_DROP_MARKER = 'npc_param(death_drop)'
+QUANTITY_RANGE_PATTERN = re.compile(r'(\d+)-(\d+)')
+DEATH_DROP_BYTES = DEATH_DROP_MARKER.encode()
+MMAP_THRESHOLD = 1 << 18
+
+MEMBERS_FLAG = 1
+QUANTITY_RANGE_FLAG = 2
+F2P_ONLY_FLAG = 4
+WORLDS = ('members', 'f2p')
+
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_MOVE_SELF = 0x800
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+
+def scan_drop_script(content: str, is_drop_table: bool = False) -> List[dict]:
+    drops = []
+    if not is_drop_table and DEATH_DROP_MARKER in content:
+        drops.append({'item': 'default_drop', 'chance': '1/1', 'quantity': '1', 'members': False, 'rarity': 'Common'})
+
+    if '$random' not in content:
+        return drops
+
+    previous_chance = 0
+    branch = RANDOM_CONDITION_PATTERN.search(content)
+    while branch is not None:
+        upper_bound = int(branch.group(1))
+        start = branch.end()
+        branch = RANDOM_CONDITION_PATTERN.search(content, start)
+        end = len(content)
+        if branch is not None:
+            # A leading "else" belongs to the next branch header, as it does in RANDOM_BRANCH_PATTERN.
+            end = branch.start()
+            while end > start and content[end - 1].isspace():
+                end -= 1
+            end = end - 4 if end - 4 >= start and content.startswith('else', end - 4) else branch.start()
+
+        # Branches are scanned in place rather than split out, and only the first
+        # obj_add in a branch can drop since it uses up the branch's chance.
+        successes = upper_bound - previous_chance
+        if successes <= 0:
+            continue
+        match = OBJ_ADD_PATTERN.search(content, start, end)
+        if match is None:
+            continue
+
+        item = match.group(1).strip()
+        if item.startswith('~'):
+            quantity = '1'
+        else:
+            quantity = DropParser.parse_quantity(match.group(2) or '1')
+        drops.append({
+            'item': item,
+            'chance': f"{successes}/128",
+            'quantity': quantity,
+            'members': content.find(MEMBERS_MARKER, start, end) != -1,
+            'rarity': 'Common'
+        })
+        previous_chance = upper_bound
+
+    return drops
+
+def may_have_drops(data) -> bool:
+    return data.find(DEATH_DROP_BYTES) != -1 or (data.find(b'$random') != -1 and data.find(b'obj_add(') != -1)
+
+def read_script(file_path: str, screen=None) -> str:
+    # Scripts are screened as raw bytes and only decoded when they pass, most area
+    # scripts have no drops at all. Big files are mapped rather than read into memory.
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < MMAP_THRESHOLD:
+            data = f.read()
+            return data.decode() if screen is None or screen(data) else None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return data[:].decode() if screen is None or screen(data) else None
+
+@lru_cache(maxsize=None)
+def max_edit_distance(total_length: int, score_cutoff: int) -> int:
+    distance = total_length
+    while distance > 0 and round(100 * (total_length - distance) / total_length) < score_cutoff:
+        distance -= 1
+    return distance
+
+class NameIndex:
+    def __init__(self, names: List[str]):
+        self.names = names
+        self.processed = [utils.full_process(name) for name in names]
+        self.postings: Dict[str, List[tuple]] = {}
+        self.ids_by_length: Dict[int, List[int]] = {}
+        for name_id, processed in enumerate(self.processed):
+            for bigram, count in self.bigrams(processed).items():
+                self.postings.setdefault(bigram, []).append((name_id, count))
+            self.ids_by_length.setdefault(len(processed), []).append(name_id)
+
+    @staticmethod
+    def bigrams(text: str) -> Counter:
+        return Counter(text[i:i + 2] for i in range(len(text) - 1))
+
+    def candidates(self, processed_query: str, score_cutoff: int) -> List[int]:
+        # Two strings within edit distance d share at least max(len) - 1 - 2d bigrams,
+        # so anything sharing fewer than that can't reach score_cutoff.
+        query_length = len(processed_query)
+        shared = {}
+        for bigram, count in self.bigrams(processed_query).items():
+            for name_id, name_count in self.postings.get(bigram, ()):
+                shared[name_id] = shared.get(name_id, 0) + min(count, name_count)
+        
+        candidates = []
+        for name_id, common in shared.items():
+            name_length = len(self.processed[name_id])
+            distance = max_edit_distance(query_length + name_length, score_cutoff)
+            if abs(query_length - name_length) <= distance and common >= max(query_length, name_length) - 1 - 2 * distance:
+                candidates.append(name_id)
+        for name_length, name_ids in self.ids_by_length.items():
+            if name_length == 0:
+                continue
+            distance = max_edit_distance(query_length + name_length, score_cutoff)
+            if abs(query_length - name_length) <= distance and max(query_length, name_length) - 1 - 2 * distance <= 0:
+                candidates.extend(name_id for name_id in name_ids if name_id not in shared)
+        candidates.sort()
+        return candidates
+
+    def extract(self, query: str, limit: int = 5, score_cutoff: int = 80) -> List[tuple]:
+        # Same results as process.extract with fuzz.ratio whenever anything scores
+        # score_cutoff or more (only those are returned then), otherwise a full scan.
+        processed_query = utils.full_process(query)
+        if processed_query:
+            matches = []
+            for name_id in self.candidates(processed_query, score_cutoff):
+                score = fuzz.ratio(processed_query, self.processed[name_id])
+                if score >= score_cutoff:
+                    matches.append((self.names[name_id], score))
+            if matches:
+                return heapq.nlargest(limit, matches, key=lambda match: match[1])
+        matches = ((name, fuzz.ratio(processed_query, processed)) for name, processed in zip(self.names, self.processed))
+        return heapq.nlargest(limit, matches, key=lambda match: match[1])
+
+class NameTable:
     def __init__(self):
+        self.names: List[str] = []
+        self.ids: Dict[str, int] = {}
+
+    def intern(self, name: str) -> int:
+        name_id = self.ids.get(name)
+        if name_id is None:
+            name_id = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return name_id
+
+    def __getitem__(self, name_id: int) -> str:
+        return self.names[name_id]
+
+class DropStore:
+    def __init__(self, names: NameTable, entries: Iterable[tuple]):
+        self.names = names
+        self.spans: Dict[str, tuple] = {}
+        self.owner_sources: Dict[int, List[str]] = {}
+        owner_rows: Dict[int, List[tuple]] = {}
+        item_owners: Dict[int, Dict[int, None]] = {}
+        for source, owner, drops in entries:
+            if not drops:
+                continue
+            owner_id = names.intern(owner)
+            rows = owner_rows.setdefault(owner_id, [])
+            if source is not None:
+                self.spans[source] = (owner_id, len(rows), len(drops))
+                self.owner_sources.setdefault(owner_id, []).append(source)
+            for drop in drops:
+                # Records carried over from a previous store are already encoded.
+                record = drop if isinstance(drop, tuple) else self.encode(drop)
+                rows.append(record)
+                item_owners.setdefault(record[0], {})[owner_id] = None
+        
+        self.owner_ids = array('i', owner_rows)
+        self.owner_positions = {owner_id: position for position, owner_id in enumerate(owner_rows)}
+        self.aliases: Dict[int, int] = {}
+        self.offsets = array('i', [0])
+        self.item_ids = array('i')
+        self.chance_nums = array('i')
+        self.chance_denoms = array('i')
+        self.quantity_mins = array('q')
+        self.quantity_maxes = array('q')
+        self.flags = bytearray()
+        owner_item_rows: Dict[tuple, List[int]] = {}
+        for owner_id, rows in owner_rows.items():
+            for item_id, num, denom, quantity_min, quantity_max, flags in rows:
+                owner_item_rows.setdefault((item_id, owner_id), []).append(len(self.item_ids))
+                self.item_ids.append(item_id)
+                self.chance_nums.append(num)
+                self.chance_denoms.append(denom)
+                self.quantity_mins.append(quantity_min)
+                self.quantity_maxes.append(quantity_max)
+                self.flags.append(flags)
+            self.offsets.append(len(self.item_ids))
+        
+        # Rows for an item are grouped by owner, in the order owners first dropped it.
+        self.drop_item_ids = array('i', item_owners)
+        self.item_positions = {item_id: position for position, item_id in enumerate(item_owners)}
+        self.item_offsets = array('i', [0])
+        self.item_rows = array('i')
+        for item_id, owners in item_owners.items():
+            for owner_id in owners:
+                self.item_rows.extend(owner_item_rows[item_id, owner_id])
+            self.item_offsets.append(len(self.item_rows))
+
+    def encode(self, drop: dict) -> tuple:
+        num, denom = map(int, drop['chance'].split('/'))
+        flags = MEMBERS_FLAG if drop['members'] else 0
+        if drop.get('f2p'):
+            flags |= F2P_ONLY_FLAG
+        range_match = QUANTITY_RANGE_PATTERN.fullmatch(drop['quantity'])
+        if range_match:
+            quantity_min, quantity_max = int(range_match.group(1)), int(range_match.group(2))
+            flags |= QUANTITY_RANGE_FLAG
+        else:
+            try:
+                quantity_min = quantity_max = int(drop['quantity'])
+            except ValueError:
+                quantity_min = quantity_max = 1
+        return self.names.intern(drop['item']), num, denom, quantity_min, quantity_max, flags
+
+    def add_alias(self, alias: str, owner: str):
+        owner_id = self.names.ids.get(owner)
+        if owner_id in self.owner_positions:
+            self.aliases[self.names.intern(alias)] = owner_id
+
+    def owner_position(self, owner: str) -> int:
+        owner_id = self.names.ids.get(owner)
+        owner_id = self.aliases.get(owner_id, owner_id)
+        if owner_id not in self.owner_positions:
+            raise KeyError(owner)
+        return self.owner_positions[owner_id]
+
+    def has_owner(self, owner: str) -> bool:
+        owner_id = self.names.ids.get(owner)
+        return owner_id in self.owner_positions or owner_id in self.aliases
+
+    def owners(self) -> List[str]:
+        return [self.names[owner_id] for owner_id in self.owner_ids] + [self.names[alias_id] for alias_id in self.aliases]
+
+    def owner_count(self) -> int:
+        return len(self.owner_ids) + len(self.aliases)
+
+    def rows(self, owner: str) -> range:
+        position = self.owner_position(owner)
+        return range(self.offsets[position], self.offsets[position + 1])
+
+    def source_rows(self, source: str) -> range:
+        if source not in self.spans:
+            return range(0)
+        owner_id, start, count = self.spans[source]
+        start += self.offsets[self.owner_positions[owner_id]]
+        return range(start, start + count)
+
+    def sources(self, owner: str) -> List[str]:
+        return self.owner_sources.get(self.names.ids.get(owner), [])
+
+    def records(self, source: str) -> List[tuple]:
+        return self.row_records(self.source_rows(source))
+
+    def row_records(self, rows: range) -> List[tuple]:
+        start, stop = rows.start, rows.stop
+        return list(zip(
+            self.item_ids[start:stop], self.chance_nums[start:stop], self.chance_denoms[start:stop],
+            self.quantity_mins[start:stop], self.quantity_maxes[start:stop], self.flags[start:stop]
+        ))
+
+    def owner_of(self, row: int) -> str:
+        return self.names[self.owner_ids[bisect_right(self.offsets, row) - 1]]
+
+    def has_item(self, item: str) -> bool:
+        return self.names.ids.get(item) in self.item_positions
+
+    def items(self) -> List[str]:
+        return [self.names[item_id] for item_id in self.drop_item_ids]
+
+    def rows_for_item(self, item: str):
+        position = self.item_positions.get(self.names.ids.get(item))
+        if position is None:
+            return self.item_rows[:0]
+        return self.item_rows[self.item_offsets[position]:self.item_offsets[position + 1]]
+
+    def item_owners(self, item: str) -> List[str]:
+        return list(dict.fromkeys(self.owner_of(row) for row in self.rows_for_item(item)))
+
+    def item(self, row: int) -> str:
+        return self.names[self.item_ids[row]]
+
+    def chance(self, row: int) -> str:
+        return f"{self.chance_nums[row]}/{self.chance_denoms[row]}"
+
+    def quantity(self, row: int) -> str:
+        if self.flags[row] & QUANTITY_RANGE_FLAG:
+            return f"{self.quantity_mins[row]}-{self.quantity_maxes[row]}"
+        return str(self.quantity_mins[row])
+
+    def members(self, row: int) -> bool:
+        return bool(self.flags[row] & MEMBERS_FLAG)
+
+    def in_world(self, row: int, world: str = None) -> bool:
+        if world == 'f2p':
+            return not self.flags[row] & MEMBERS_FLAG
+        if world == 'members':
+            return not self.flags[row] & F2P_ONLY_FLAG
+        return True
+
+    def rate(self, row: int) -> Fraction:
+        num, denom = self.chance_nums[row], self.chance_denoms[row]
+        if num <= 0 or denom <= 0:
+            return Fraction(0)
+        return Fraction(num, denom)
+
+    def rate_key(self, row: int) -> tuple:
+        return self.item(row), self.quantity(row), self.members(row)
+
+    def drop(self, row: int) -> dict:
+        return {'item': self.item(row), 'chance': self.chance(row), 'quantity': self.quantity(row), 'members': self.members(row), 'rarity': 'Common'}
+
+    def drops(self, owner: str) -> List[dict]:
+        return [self.drop(row) for row in self.rows(owner)]
+
+class DropsView(Mapping):
+    def __init__(self, store: DropStore):
+        self.store = store
+
+    def __getitem__(self, owner: str) -> List[dict]:
+        return self.store.drops(owner)
+
+    def __contains__(self, owner) -> bool:
+        return self.store.has_owner(owner)
+
+    def __iter__(self):
+        return iter(self.store.owners())
+
+    def __len__(self) -> int:
+        return self.store.owner_count()
+
+class ItemOwnersView(Mapping):
+    def __init__(self, store: DropStore):
+        self.store = store
+
+    def __getitem__(self, item: str) -> List[str]:
+        if not self.store.has_item(item):
+            raise KeyError(item)
+        return self.store.item_owners(item)
+
+    def __contains__(self, item) -> bool:
+        return self.store.has_item(item)
+
+    def __iter__(self):
+        return iter(self.store.items())
+
+    def __len__(self) -> int:
+        return len(self.store.drop_item_ids)
+
+class ResultCache:
+    def __init__(self, size: int = 256, ttl: float = None):
+        self.size = size
+        self.ttl = ttl
+        self.entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: tuple):
+        entry = self.entries.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+            del self.entries[key]
+            self.expirations += 1
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key: tuple, result):
+        if self.size <= 0:
+            return
+        self.entries[key] = (result, time.monotonic() + self.ttl if self.ttl else None)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        if self.entries:
+            self.invalidations += 1
+        self.entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            'entries': len(self.entries),
+            'size': self.size,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations,
+        }
+
+NULL_STAGE = contextlib.nullcontext()
+
+class Instrumentation:
+    def __init__(self, enabled: bool = False, top: int = 10):
+        self.enabled = enabled
+        self.top = top
+        self.timings: Dict[str, list] = {}
+        self.counters = Counter()
+        self.slowest_files: List[tuple] = []
+
+    def stage(self, name: str):
+        if not self.enabled:
+            return NULL_STAGE
+        return self.timed(name)
+
+    @contextlib.contextmanager
+    def timed(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            timing = self.timings.setdefault(name, [0.0, 0])
+            timing[0] += time.perf_counter() - start
+            timing[1] += 1
+
+    def count(self, name: str, amount: int = 1):
+        if self.enabled:
+            self.counters[name] += amount
+
+    def record_file(self, file_path: str, seconds: float):
+        if len(self.slowest_files) < self.top:
+            heapq.heappush(self.slowest_files, (seconds, file_path))
+        elif seconds > self.slowest_files[0][0]:
+            heapq.heapreplace(self.slowest_files, (seconds, file_path))
+
+    def stats(self) -> dict:
+        return {
+            'enabled': self.enabled,
+            'stages': {name: {'seconds': round(seconds, 6), 'calls': calls} for name, (seconds, calls) in self.timings.items()},
+            'counters': dict(self.counters),
+            'slowest_files': [{'path': file_path, 'seconds': round(seconds, 6)} for seconds, file_path in sorted(self.slowest_files, reverse=True)],
+        }
+
+def revision_index_path(root: str, index_path: str = "drop_index.json") -> str:
+    # The usual Server checkout keeps drop_index.json, any other root gets its own file.
+    if os.path.abspath(root) == os.path.abspath("Server"):
+        return index_path
+    base, extension = os.path.splitext(index_path)
+    return f"{base}.{hashlib.sha1(os.path.abspath(root).encode()).hexdigest()[:12]}{extension}"
+
+def holding_lock(method):
+    @wraps(method)
+    def locked(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return locked
+
+class DropParser:
+    def __init__(self, index_path: str = "drop_index.json", workers: int = 1, cache_size: int = 256, cache_ttl: float = None, root: str = "Server", instrument: bool = False, names: NameTable = None):
+        self.root = root
+        scripts_path = os.path.join(root, "data", "src", "scripts")
         self.base_paths = [
-            r"Server\data\src\scripts\drop tables\scripts",
-            r"Server\data\src\scripts\areas"
+            os.path.join(scripts_path, "drop tables", "scripts"),
+            os.path.join(scripts_path, "areas")
         ]
-        self.shared_droptables_path = r"Server\data\src\scripts\drop tables\scripts\shared_droptables.rs2"
+        self.shared_droptables_path = os.path.join(self.base_paths[0], "shared_droptables.rs2")
         self.drop_table_mappings = {
             'rare_drop_table': 'randomherb',
             'ultrarare_drop_table': 'ultrarare_getitem',
             'gem_drop_table': 'randomjewel'
         }
         self.reverse_drop_table_mappings = {v: k for k, v in self.drop_table_mappings.items()}
-        self.monsters: Dict[str, List[dict]] = {}
-        self.items_to_monsters: Dict[str, List[str]] = {}
-        self.drop_tables: Dict[str, List[dict]] = {}
-        self.empty_files = self.load_empty_files()
+        self.names = names if names is not None else NameTable()
+        self.monsters: Mapping[str, List[dict]] = {}
+        self.items_to_monsters: Mapping[str, List[str]] = {}
+        self.drop_tables: Mapping[str, List[dict]] = {}
+        self.file_signatures: Dict[str, list] = {}
+        self.shared_signature = None
+        self.lock = threading.RLock()
+        self.result_cache = ResultCache(cache_size, cache_ttl)
+        self.instrumentation = Instrumentation(instrument)
+        self.index_path = index_path
+        self.workers = workers
         self.parse_files()
 
-    def load_empty_files(self):
+    def load_index(self) -> dict:
         try:
-            with open("empty_files.json", "r") as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return {}
+            with open(self.index_path, "r") as f:
+                index = json.load(f)
+        except (FileNotFoundError, ValueError):
+            index = None
+        if not isinstance(index, dict) or index.get('version') != INDEX_VERSION:
+            return {'version': INDEX_VERSION, 'shared': {}, 'files': {}}
+        return index
 
-    def parse_files(self):
-        new_empty_files = {}
-        
-        if os.path.exists(self.shared_droptables_path):
-            self.parse_shared_droptables(self.shared_droptables_path)
-        
+    def save_index(self, index: dict):
+        temp_path = self.index_path + ".tmp"
+        with open(temp_path, "w") as f:
+            f.write(json.dumps(index))
+        os.replace(temp_path, self.index_path)
+
+    def file_signature(self, file_path: str) -> list:
+        stat = os.stat(file_path)
+        return [stat.st_mtime, stat.st_size]
+
+    def find_scripts(self) -> List[tuple]:
+        scripts = []
         for base_path in self.base_paths:
             if not os.path.exists(base_path):
                 continue
 
-            files_found = False
             for root, _, files in os.walk(base_path):
                 for filename in files:
                     full_path = os.path.join(root, filename)
                     if 'shared_droptables.rs2' in filename.lower():
                         continue
-                    files_found = True
-                    
-                    current_mtime = os.path.getmtime(full_path)
-                    if full_path in self.empty_files and self.empty_files[full_path] == current_mtime:
-                        new_empty_files[full_path] = current_mtime
+                    try:
+                        signature = self.file_signature(full_path)
+                    except FileNotFoundError:
                         continue
-                    
-                    drops = self.parse_drop_file(full_path)
-                    if drops:
-                        monster_name = filename.split('.')[0]
-                        if monster_name in self.monsters:
-                            self.monsters[monster_name].extend(drops)
-                        else:
-                            self.monsters[monster_name] = drops
-                        for drop in drops:
-                            item = drop['item']
-                            if item not in self.items_to_monsters:
-                                self.items_to_monsters[item] = []
-                            if monster_name not in self.items_to_monsters[item]:
-                                self.items_to_monsters[item].append(monster_name)
-                    else:
-                        new_empty_files[full_path] = current_mtime
-            
-            if not files_found:
-                pass
+                    scripts.append((full_path, filename.split('.')[0], signature))
+        return scripts
+
+    def parse_files(self):
+        stage = self.instrumentation.stage
+        with stage('load_index'):
+            index = self.load_index()
+        old_files = index['files']
+        new_files = {}
+        new_shared = {}
+        dirty = False
+        self.drop_tables = {}
+        
+        if os.path.exists(self.shared_droptables_path):
+            signature = self.file_signature(self.shared_droptables_path)
+            cached = index['shared']
+            if cached.get('path') == self.shared_droptables_path and cached.get('signature') == signature:
+                self.drop_tables.update(cached['tables'])
+                self.apply_drop_table_mappings()
+            else:
+                with stage('parse_shared_droptables'):
+                    self.parse_shared_droptables(self.shared_droptables_path)
+                dirty = True
+            new_shared = self.shared_index_entry(signature)
+            self.shared_signature = signature
+        elif index['shared']:
+            dirty = True
+        
+        with stage('walk'):
+            scripts = self.find_scripts()
+        stale_paths = []
+        for full_path, _, signature in scripts:
+            cached = old_files.get(full_path)
+            if cached is not None and cached['signature'] == signature:
+                new_files[full_path] = cached
+            else:
+                new_files[full_path] = {'signature': signature, 'drops': None}
+                stale_paths.append(full_path)
+        self.instrumentation.count('files_walked', len(scripts))
+        self.instrumentation.count('files_cached', len(scripts) - len(stale_paths))
         
-        with open("empty_files.json", "w") as f:
-            json.dump(new_empty_files, f)
+        if stale_paths:
+            dirty = True
+            for full_path, drops in zip(stale_paths, self.parse_drop_files(stale_paths)):
+                new_files[full_path]['drops'] = drops
+        
+        with stage('build_store'):
+            self.store = DropStore(self.names, ((full_path, monster_name, new_files[full_path]['drops']) for full_path, monster_name, _ in scripts))
+            self.table_store = self.build_table_store()
+        self.file_signatures = {full_path: entry['signature'] for full_path, entry in new_files.items()}
+        
+        if dirty or new_files.keys() != old_files.keys():
+            with stage('save_index'):
+                self.save_index({'version': INDEX_VERSION, 'shared': new_shared, 'files': new_files})
+        
+        with stage('build_views'):
+            self.build_views()
+        self.result_cache.clear()
         
         print(f"Loaded {len(self.monsters)} monsters")
         print(f"Loaded {len(self.items_to_monsters)} items")
         print(f"Loaded {len(self.drop_tables)} shared drop tables")
 
-    def parse_quantity(self, quantity_str: str) -> str:
+    def shared_index_entry(self, signature: list) -> dict:
+        return {
+            'path': self.shared_droptables_path,
+            'signature': signature,
+            'tables': {k: v for k, v in self.drop_tables.items() if k not in self.drop_table_mappings}
+        }
+
+    def build_table_store(self) -> DropStore:
+        table_store = DropStore(self.names, (
+            (None, table_name, drops) for table_name, drops in self.drop_tables.items()
+            if self.drop_table_mappings.get(table_name) not in self.drop_tables
+        ))
+        for table_name, proc_name in self.drop_table_mappings.items():
+            table_store.add_alias(table_name, proc_name)
+        return table_store
+
+    def build_views(self):
+        self.monsters = DropsView(self.store)
+        self.items_to_monsters = ItemOwnersView(self.store)
+        self.drop_tables = DropsView(self.table_store)
+        self.build_effective_rates()
+        self.monster_index = NameIndex(list(self.monsters))
+        self.item_index = NameIndex(list(self.items_to_monsters) + [item for item in self.shared_items if item not in self.items_to_monsters])
+        signatures = json.dumps([INDEX_VERSION, self.shared_signature, sorted(self.file_signatures.items())])
+        self.data_version = f"{INDEX_VERSION}-{hashlib.sha1(signatures.encode()).hexdigest()[:16]}"
+
+    def reload(self) -> List[str]:
+        # Everything is rebuilt on a shallow copy and swapped in under the lock, so
+        # queries running on other threads only ever see the old or the new state.
+        staged = copy.copy(self)
+        changed = []
+        new_shared = None
+        
+        shared_signature = self.file_signature(self.shared_droptables_path) if os.path.exists(self.shared_droptables_path) else None
+        if shared_signature != self.shared_signature:
+            staged.drop_tables = {}
+            if shared_signature is not None:
+                with self.instrumentation.stage('parse_shared_droptables'):
+                    staged.parse_shared_droptables(self.shared_droptables_path)
+            new_shared = staged.shared_index_entry(shared_signature) if shared_signature is not None else {}
+            staged.table_store = staged.build_table_store()
+            staged.shared_signature = shared_signature
+            changed.append(self.shared_droptables_path)
+        
+        with self.instrumentation.stage('walk'):
+            scripts = self.find_scripts()
+        stale_paths = [full_path for full_path, _, signature in scripts if self.file_signatures.get(full_path) != signature]
+        removed_paths = self.file_signatures.keys() - {full_path for full_path, _, _ in scripts}
+        # Every walked file is either cached or parsed, idle polls included, so the counters add up.
+        self.instrumentation.count('polls')
+        self.instrumentation.count('files_walked', len(scripts))
+        self.instrumentation.count('files_cached', len(scripts) - len(stale_paths))
+        if not changed and not stale_paths and not removed_paths:
+            return []
+        changed += stale_paths + sorted(removed_paths)
+        
+        parsed = dict(zip(stale_paths, self.parse_drop_files(stale_paths)))
+        with self.instrumentation.stage('build_store'):
+            staged.store = DropStore(self.names, (
+                (full_path, monster_name, parsed[full_path] if full_path in parsed else self.store.records(full_path))
+                for full_path, monster_name, _ in scripts
+            ))
+        staged.file_signatures = {full_path: signature for full_path, _, signature in scripts}
+        with self.instrumentation.stage('build_views'):
+            staged.build_views()
+        
+        index = self.load_index()
+        for full_path in removed_paths:
+            index['files'].pop(full_path, None)
+        for full_path, _, signature in scripts:
+            cached = index['files'].get(full_path)
+            if full_path in parsed or cached is None or cached['signature'] != signature:
+                drops = parsed[full_path] if full_path in parsed else [staged.store.drop(row) for row in staged.store.source_rows(full_path)]
+                index['files'][full_path] = {'signature': signature, 'drops': drops}
+        if new_shared is not None:
+            index['shared'] = new_shared
+        
+        with self.lock:
+            self.__dict__.update(staged.__dict__)
+            self.result_cache.clear()
+        with self.instrumentation.stage('save_index'):
+            self.save_index(index)
+        self.instrumentation.count('reloads')
+        return changed
+
+    def table_reference(self, store: DropStore, row: int) -> str:
+        item = store.item(row)
+        if item.startswith('~') and item.lstrip('~') in self.drop_tables:
+            return item.lstrip('~')
+        return None
+
+    def table_rates(self, table_name: str, stack: tuple = (), world: str = None) -> tuple:
+        # world=None keeps every row (what the tables display), 'members' or 'f2p' only
+        # keeps the rows that can actually roll on that kind of world.
+        if (table_name, world) in self.table_rate_cache:
+            return self.table_rate_cache[table_name, world], set()
+        stack = stack + (table_name,)
+        rates: Dict[tuple, Fraction] = {}
+        cut = set()
+        reroll_chance = Fraction(0)
+        for row in self.table_store.rows(table_name):
+            chance = self.table_store.rate(row)
+            if not chance or not self.table_store.in_world(row, world):
+                continue
+            nested_table = self.table_reference(self.table_store, row)
+            if nested_table is None:
+                key = self.table_store.rate_key(row)
+                rates[key] = rates.get(key, 0) + chance
+            elif nested_table == table_name:
+                reroll_chance += chance
+            elif nested_table in stack:
+                cut.add(nested_table)
+            else:
+                nested_rates, nested_cut = self.table_rates(nested_table, stack, world)
+                cut |= nested_cut
+                for (item, quantity, members), rate in nested_rates.items():
+                    key = (item, quantity, members or self.table_store.members(row))
+                    rates[key] = rates.get(key, 0) + chance * rate
+        # A table returning itself rolls again, anything else already on the stack is
+        # left out (as expand_drop_table does) and the result isn't cached.
+        if 0 < reroll_chance < 1:
+            rates = {key: rate / (1 - reroll_chance) for key, rate in rates.items()}
+        cut.discard(table_name)
+        if not cut:
+            self.table_rate_cache[table_name, world] = rates
+        return rates, cut
+
+    def build_effective_rates(self):
+        self.table_rate_cache: Dict[tuple, Dict[tuple, Fraction]] = {}
+        self.effective_rate_cache: Dict[tuple, Dict[tuple, Fraction]] = {}
+        self.shared_source_cache: Dict[tuple, Dict[tuple, Fraction]] = {}
+        self.table_references: Dict[str, List[int]] = {}
+        for item in self.store.items():
+            if item.startswith('~') and item.lstrip('~') in self.drop_tables:
+                self.table_references[item.lstrip('~')] = self.store.rows_for_item(item)
+        self.shared_items = {}
+        for table_name in self.table_references:
+            for world in WORLDS:
+                for item, _, _ in self.table_rates(table_name, world=world)[0]:
+                    if not item.startswith('~'):
+                        self.shared_items.setdefault(item, None)
+
+    def effective_drop_rates(self, monster: str, world: str = 'members') -> Dict[tuple, Fraction]:
+        if (monster, world) in self.effective_rate_cache:
+            return self.effective_rate_cache[monster, world]
+        rates = {}
+        for row in self.store.rows(monster):
+            if not self.store.in_world(row, world):
+                continue
+            chance = self.store.rate(row)
+            for key, rate in self.row_outcomes(row, world).items():
+                rates[key] = rates.get(key, 0) + chance * rate
+        self.effective_rate_cache[monster, world] = rates
+        return rates
+
+    def row_outcomes(self, row: int, world: str = None) -> Dict[tuple, Fraction]:
+        nested_table = self.table_reference(self.store, row)
+        if nested_table is None:
+            return {self.store.rate_key(row): Fraction(1)}
+        outcomes = {}
+        for (item, quantity, members), rate in self.table_rates(nested_table, world=world)[0].items():
+            key = (item, quantity, members or self.store.members(row))
+            outcomes[key] = outcomes.get(key, 0) + rate
+        return outcomes
+
+    def shared_item_sources(self, item: str, world: str = 'members') -> Dict[tuple, Fraction]:
+        # Rates are for one kind of world, mixing both would count the herb table's
+        # f2p-only early return alongside the members-only herbs.
+        if (item, world) in self.shared_source_cache:
+            return self.shared_source_cache[item, world]
+        sources = {}
+        if item in self.shared_items:
+            for table_name, rows in self.table_references.items():
+                table_rates = [(key, rate) for key, rate in self.table_rates(table_name, world=world)[0].items() if key[0] == item]
+                if not table_rates:
+                    continue
+                for row in sorted(rows):
+                    if not self.store.in_world(row, world):
+                        continue
+                    monster, chance, drop_members = self.store.owner_of(row), self.store.rate(row), self.store.members(row)
+                    for (_, quantity, members), rate in table_rates:
+                        source = (table_name, monster, quantity, members or drop_members)
+                        sources[source] = sources.get(source, 0) + chance * rate
+        self.shared_source_cache[item, world] = sources
+        return sources
+
+    def format_rate(self, rate: Fraction) -> str:
+        return self.reduce_to_one(f"{rate.numerator}/{rate.denominator}")
+
+    def parse_drop_files(self, file_paths: List[str]) -> List[List[dict]]:
+        instrumentation = self.instrumentation
+        parse = DropParser.timed_parse_drop_file if instrumentation.enabled else DropParser.parse_drop_file
+        with instrumentation.stage('parse_scripts'):
+            if self.workers <= 1 or len(file_paths) < 2:
+                results = [parse(file_path) for file_path in file_paths]
+            else:
+                chunksize = max(1, len(file_paths) // (self.workers * 4))
+                with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                    results = list(executor.map(parse, file_paths, chunksize=chunksize))
+        if not instrumentation.enabled:
+            return results
+        
+        parsed = []
+        for file_path, (drops, seconds, size) in zip(file_paths, results):
+            instrumentation.record_file(file_path, seconds)
+            instrumentation.count('files_parsed')
+            instrumentation.count('bytes_read', size)
+            instrumentation.count('drops_emitted', len(drops))
+            parsed.append(drops)
+        return parsed
+
+    @staticmethod
+    def parse_quantity(quantity_str: str) -> str:
         quantity_str = quantity_str.strip()
-        calc_match = re.match(r'calc\(random\((\d+)\)\s*\+\s*(\d+)\)', quantity_str)
+        calc_match = CALC_QUANTITY_PATTERN.match(quantity_str)
         if calc_match:
             random_max = int(calc_match.group(1))
             offset = int(calc_match.group(2))
@@ -92,311 +859,920 @@ class DropParser:
         except ValueError:
             return '1'
 
-    def parse_drop_file(self, file_path: str, is_drop_table: bool = False) -> List[dict]:
-        drops = []
+    @staticmethod
+    def timed_parse_drop_file(file_path: str) -> tuple:
+        start = time.perf_counter()
+        drops = DropParser.parse_drop_file(file_path)
+        seconds = time.perf_counter() - start
         try:
-            with open(file_path, 'r') as f:
-                content = f.read()
-                
-                if not is_drop_table and 'npc_param(death_drop)' in content:
-                    drops.append({'item': 'default_drop', 'chance': '1/1', 'quantity': '1', 'members': False, 'rarity': 'Common'})
-
-                blocks = re.split(r'(?:else\s*)?if\s*\(\$random\s*<\s*(\d+)\)', content)
-                if len(blocks) > 1:
-                    blocks = blocks[1:]
-                    previous_chance = 0
-                    
-                    for i in range(0, len(blocks), 2):
-                        upper_bound = int(blocks[i])
-                        block_content = blocks[i + 1]
-                        is_members = 'map_members = true' in block_content
-                        
-                        drop_matches = re.findall(
-                            r'obj_add\(npc_coord,\s*([^,]+)(?:,\s*([^,]+))?(?:,\s*\^lootdrop_duration\))?', 
-                            block_content
-                        )
-                        for match in drop_matches:
-                            item = match[0].strip()
-                            quantity = match[1].strip() if len(match) > 1 and match[1] else '1'
-                            successes = upper_bound - previous_chance
-                            if successes <= 0:
-                                continue
-                            chance = f"{successes}/128"
-                            if item.startswith('~'):
-                                drops.append({
-                                    'item': item,
-                                    'chance': chance,
-                                    'quantity': '1',
-                                    'members': is_members,
-                                    'rarity': 'Common'
-                                })
-                            else:
-                                parsed_quantity = self.parse_quantity(quantity)
-                                drops.append({
-                                    'item': item,
-                                    'chance': chance,
-                                    'quantity': parsed_quantity,
-                                    'members': is_members,
-                                    'rarity': 'Common'
-                                })
-                            previous_chance = upper_bound
+            size = os.path.getsize(file_path)
+        except OSError:
+            size = 0
+        return drops, seconds, size
 
+    @staticmethod
+    def parse_drop_file(file_path: str, is_drop_table: bool = False) -> List[dict]:
+        try:
+            content = read_script(file_path, None if is_drop_table else may_have_drops)
         except Exception:
-            pass
-            
-        return drops
+            return []
+        if content is None:
+            return []
+        return scan_drop_script(content, is_drop_table)
 
     def reduce_to_one(self, chance: str) -> str:
         if '/' not in chance:
             return chance
         num, denom = map(int, chance.split('/'))
+        return self.reduce_counts(num, denom)
+
+    def reduce_counts(self, num: int, denom: int) -> str:
         if num == 0:
             return "0/1"
         reduced_denom = round(denom / num)
         return f"1/{reduced_denom}"
 
+    def row_chance(self, store: DropStore, row: int, base_num: int = 1, base_denom: int = 1) -> str:
+        num, denom = store.chance_nums[row], store.chance_denoms[row]
+        if num == 1 and denom == 1:
+            return "1/1"
+        return self.reduce_counts(num * base_num, denom * base_denom)
+
     def parse_shared_droptables(self, file_path: str):
         try:
-            with open(file_path, 'r') as f:
-                content = f.read()
+            content = read_script(file_path)
+            
+            headers = list(PROC_HEADER_PATTERN.finditer(content))
+            
+            for index, header in enumerate(headers):
+                drops = []
+                proc_name = header.group(1)
+                proc_end = headers[index + 1].start() if index + 1 < len(headers) else len(content)
+                proc_content = content[header.end():proc_end].strip()
+                
+                early_return = EARLY_RETURN_PATTERN.search(proc_content)
+                if early_return:
+                    item, quantity = early_return.groups()
+                    drops.append({
+                        'item': item.strip(),
+                        'chance': '1/1',
+                        'quantity': self.parse_quantity(quantity),
+                        'members': False,
+                        'f2p': True,
+                        'rarity': 'Common'
+                    })
+                
+                random_def = RANDOM_DEF_PATTERN.findall(proc_content)
+                random_max = 128
+                if random_def:
+                    random_max = int(random_def[-1])
+                
+                blocks = RANDOM_BRANCH_PATTERN.split(proc_content)[1:]
+                previous_chance = 0
                 
-                procedures = re.split(r'\[proc,[^\]]+\]\(\)\(namedobj, int\)', content)[1:]
-                proc_names = re.findall(r'\[proc,([^\]]+)\]\(\)\(namedobj, int\)', content)
+                is_rare_drop_table = proc_name == 'randomherb'
                 
-                for proc_name, proc_content in zip(proc_names, procedures):
-                    drops = []
-                    proc_content = proc_content.strip()
+                for i in range(0, len(blocks), 2):
+                    upper_bound = int(blocks[i])
+                    block_content = blocks[i + 1]
+                    is_members = MEMBERS_MARKER in block_content or (is_rare_drop_table and bool(drops))
+                    
+                    return_matches = RETURN_PATTERN.findall(block_content)
+                    proc_matches = PROC_RETURN_PATTERN.findall(block_content)
+                    
+                    for item, quantity in return_matches:
+                        item = item.strip()
+                        successes = upper_bound - previous_chance
+                        chance = f"{successes}/{random_max}"
+                        parsed_quantity = self.parse_quantity(quantity)
+                        drops.append({
+                            'item': item,
+                            'chance': chance,
+                            'quantity': parsed_quantity,
+                            'members': is_members,
+                            'rarity': 'Common'
+                        })
+                        previous_chance = upper_bound
                     
-                    early_return = re.search(r'if\s*\(map_members\s*=\s*false\)\s*\{\s*return\s*\(([^,]+),\s*([^)]+)\);', proc_content)
-                    if early_return:
-                        item, quantity = early_return.groups()
+                    for proc_ref in proc_matches:
+                        successes = upper_bound - previous_chance
+                        chance = f"{successes}/{random_max}"
+                        drops.append({
+                            'item': f"~{proc_ref}",
+                            'chance': chance,
+                            'quantity': '1',
+                            'members': is_members,
+                            'rarity': 'Common'
+                        })
+                        previous_chance = upper_bound
+                
+                switch_match = SWITCH_PATTERN.search(proc_content)
+                if switch_match:
+                    switch_max = int(switch_match.group(1)) + 1
+                    switch_content = switch_match.group(2)
+                    case_matches = CASE_PATTERN.findall(switch_content)
+                    default_match = DEFAULT_CASE_PATTERN.search(switch_content)
+                    chance = f"1/{switch_max}"
+                    for item, quantity in case_matches:
                         drops.append({
                             'item': item.strip(),
-                            'chance': '1/1',
+                            'chance': chance,
+                            'quantity': self.parse_quantity(quantity),
+                            'members': False,
+                            'rarity': 'Common'
+                        })
+                    if default_match:
+                        item, quantity = default_match.groups()
+                        drops.append({
+                            'item': item.strip(),
+                            'chance': chance,
                             'quantity': self.parse_quantity(quantity),
                             'members': False,
                             'rarity': 'Common'
                         })
-                    
-                    random_def = re.findall(r'\$random\s*=\s*random\((\d+)\);', proc_content)
-                    random_max = 128
-                    if random_def:
-                        random_max = int(random_def[-1])
-                    
-                    blocks = re.split(r'(?:else\s*)?if\s*\(\$random\s*<\s*(\d+)\)', proc_content)[1:]
-                    previous_chance = 0
-                    
-                    is_rare_drop_table = proc_name == 'randomherb'
-                    
-                    for i in range(0, len(blocks), 2):
-                        upper_bound = int(blocks[i])
-                        block_content = blocks[i + 1]
-                        is_members = 'map_members = true' in block_content or (is_rare_drop_table and drops)
-                        
-                        return_matches = re.findall(r'return\s*\(([^,]+),\s*([^)]+)\);', block_content)
-                        proc_matches = re.findall(r'return\s*\(~([^\)]+)\);', block_content)
-                        
-                        for item, quantity in return_matches:
-                            item = item.strip()
-                            successes = upper_bound - previous_chance
-                            chance = f"{successes}/{random_max}"
-                            parsed_quantity = self.parse_quantity(quantity)
-                            drops.append({
-                                'item': item,
-                                'chance': chance,
-                                'quantity': parsed_quantity,
-                                'members': is_members,
-                                'rarity': 'Common'
-                            })
-                            previous_chance = upper_bound
-                        
-                        for proc_ref in proc_matches:
-                            successes = upper_bound - previous_chance
-                            chance = f"{successes}/{random_max}"
-                            drops.append({
-                                'item': f"~{proc_ref}",
-                                'chance': chance,
-                                'quantity': '1',
-                                'members': is_members,
-                                'rarity': 'Common'
-                            })
-                            previous_chance = upper_bound
-                    
-                    switch_match = re.search(r'switch_int\s*\(random\((\d+)\)\)\s*\{([^}]+)\}', proc_content)
-                    if switch_match:
-                        switch_max = int(switch_match.group(1)) + 1
-                        switch_content = switch_match.group(2)
-                        case_matches = re.findall(r'case\s*\d+\s*:\s*return\s*\(([^,]+),\s*([^)]+)\);', switch_content)
-                        default_match = re.search(r'case\s*default\s*:\s*return\s*\(([^,]+),\s*([^)]+)\);', switch_content)
-                        chance = f"1/{switch_max}"
-                        for item, quantity in case_matches:
-                            drops.append({
-                                'item': item.strip(),
-                                'chance': chance,
-                                'quantity': self.parse_quantity(quantity),
-                                'members': False,
-                                'rarity': 'Common'
-                            })
-                        if default_match:
-                            item, quantity = default_match.groups()
-                            drops.append({
-                                'item': item.strip(),
-                                'chance': chance,
-                                'quantity': self.parse_quantity(quantity),
-                                'members': False,
-                                'rarity': 'Common'
-                            })
-                    
-                    if drops:
-                        self.drop_tables[proc_name] = drops
-                
-                for table_name, proc_name in self.drop_table_mappings.items():
-                    if proc_name in self.drop_tables:
-                        self.drop_tables[table_name] = self.drop_tables[proc_name]
                 
+                if drops:
+                    self.drop_tables[proc_name] = drops
+            
+            self.apply_drop_table_mappings()
+            
         except Exception:
             pass
 
-    def fuzzy_search(self, query: str, choices: List[str], limit: int = 5) -> List[tuple]:
-        matches = process.extract(query, choices, limit=limit, scorer=fuzz.ratio)
+    def apply_drop_table_mappings(self):
+        for table_name, proc_name in self.drop_table_mappings.items():
+            if proc_name in self.drop_tables:
+                self.drop_tables[table_name] = self.drop_tables[proc_name]
+
+    def fuzzy_search(self, query: str, choices, limit: int = 5) -> List[tuple]:
+        if isinstance(choices, NameIndex):
+            matches = choices.extract(query, limit=limit)
+        else:
+            matches = process.extract(query, choices, limit=limit, scorer=fuzz.ratio)
         if matches and matches[0][1] == 100:
             return [m for m in matches if m[1] >= 95]
         return matches
 
-    def display_drop_table(self, table_name: str, base_chance: str = "1/1", is_members: bool = False, visited: set = None) -> None:
+    def show_special_tables(self, output_format: str = 'table') -> None:
+        sys.stdout.write(render_result(self.resolve_special_tables(), output_format))
+
+    def search_monster(self, monster_name: str, output_format: str = 'table') -> None:
+        sys.stdout.write(render_result(self.resolve('monster', monster_name), output_format))
+
+    def search_item(self, item_name: str, output_format: str = 'table') -> None:
+        sys.stdout.write(render_result(self.resolve('item', item_name), output_format))
+
+    def drop_row(self, store: DropStore, row: int, chance: str) -> dict:
+        return {'item': store.item(row), 'chance': chance, 'quantity': store.quantity(row), 'members': store.members(row)}
+
+    def expand_drop_table(self, table_name: str, base_chance: str = "1/1", visited: set = None) -> dict:
         if visited is None:
             visited = set()
         if table_name in visited:
-            print(f"    (Recursive reference to {table_name} skipped)")
-            return
+            return {'table': table_name, 'base_chance': base_chance, 'skipped': 'recursive'}
         visited.add(table_name)
         
-        if table_name not in self.drop_tables or not self.drop_tables[table_name]:
-            print(f"    (No data found for {table_name})")
-            return
+        if not self.table_store.has_owner(table_name):
+            return {'table': table_name, 'base_chance': base_chance, 'skipped': 'missing'}
         
         base_num, base_denom = map(int, base_chance.split('/'))
-        print(f"\n    {table_name} contents (Base Chance: {base_chance}):")
-        print("    " + "-" * 60)
-        print(f"    {'Item':<25} {'Chance':>12} {'Quantity':>10} {'Members':>8}")
-        print("    " + "-" * 60)
-        for drop in self.drop_tables[table_name]:
-            adjusted_chance = drop['chance'] if drop['chance'] == '1/1' else self.reduce_to_one(f"{int(drop['chance'].split('/')[0]) * base_num}/{int(drop['chance'].split('/')[1]) * base_denom}")
-            members_str = "Yes" if drop['members'] else "No"
-            print(f"    {drop['item']:<25} {adjusted_chance:>12} {drop['quantity']:>10} {members_str:>8}")
-            if drop['item'].startswith('~'):
-                nested_table = drop['item'].lstrip('~')
-                if nested_table in self.drop_tables:
-                    self.display_drop_table(nested_table, adjusted_chance, drop['members'], visited)
-
-    def show_special_tables(self):
-        for table_name in self.drop_table_mappings.keys():
-            self.display_drop_table(table_name)
-
-    def search_monster(self, monster_name: str) -> None:
-        monster_name = monster_name.lower()
-        all_monsters = list(self.monsters.keys())
-        
-        matches = self.fuzzy_search(monster_name, all_monsters)
+        store = self.table_store
+        rows = []
+        for row in store.rows(table_name):
+            adjusted_chance = self.row_chance(store, row, base_num, base_denom)
+            drop_row = self.drop_row(store, row, adjusted_chance)
+            if drop_row['item'].startswith('~'):
+                nested_table = drop_row['item'].lstrip('~')
+                if store.has_owner(nested_table):
+                    drop_row['table'] = self.expand_drop_table(nested_table, adjusted_chance, visited)
+            rows.append(drop_row)
+        return {'table': table_name, 'base_chance': base_chance, 'drops': rows}
+
+    def resolve_monster_drops(self, monster: str, score: int) -> dict:
+        rows = []
+        special_table_references = {}
+        for row in self.store.rows(monster):
+            adjusted_chance = self.row_chance(self.store, row)
+            rows.append(self.drop_row(self.store, row, adjusted_chance))
+            if rows[-1]['item'].startswith('~'):
+                nested_table = rows[-1]['item'].lstrip('~')
+                drop_table_key = self.reverse_drop_table_mappings.get(nested_table, nested_table)
+                if self.table_store.has_owner(drop_table_key):
+                    special_table_references[nested_table] = adjusted_chance
+        with self.instrumentation.stage('expand_tables'):
+            tables = [self.expand_drop_table(table_name, chance) for table_name, chance in special_table_references.items()]
+        # Exact per-item chances with every shared table flattened in, rather than the rounded
+        # 1/x chain above. Members and free worlds roll different rows so each gets its own list.
+        effective = {
+            world: [
+                {'item': item, 'chance': self.format_rate(rate), 'rate': str(rate), 'quantity': quantity, 'members': members}
+                for (item, quantity, members), rate in self.effective_drop_rates(monster, world).items()
+            ]
+            for world in WORLDS
+        }
+        return {'name': monster, 'score': score, 'drops': rows, 'tables': tables, 'effective': effective}
+
+    def resolve_item_sources(self, item: str, score: int) -> dict:
+        rows = []
+        for row in self.store.rows_for_item(item):
+            rows.append({'monster': self.store.owner_of(row), 'chance': self.row_chance(self.store, row), 'quantity': self.store.quantity(row), 'members': self.store.members(row)})
+        with self.instrumentation.stage('shared_sources'):
+            shared_sources = sorted(self.shared_item_sources(item).items(), key=lambda source: source[0][0])
+        shared_rows = [
+            {'monster': monster, 'table': table_name, 'chance': self.format_rate(rate), 'rate': str(rate), 'quantity': quantity, 'members': members}
+            for (table_name, monster, quantity, members), rate in shared_sources
+        ]
+        return {'name': item, 'score': score, 'sources': rows, 'shared_sources': shared_rows}
+
+    def stats(self) -> dict:
+        stats = self.instrumentation.stats()
+        stats['result_cache'] = self.result_cache.stats()
+        stats['loaded'] = {'monsters': len(self.monsters), 'items': len(self.items_to_monsters), 'tables': len(self.drop_tables)}
+        return stats
+
+    def cached_result(self, key: tuple, resolve_result) -> dict:
+        result = self.result_cache.get(key)
+        if result is None:
+            result = resolve_result()
+            self.result_cache.put(key, result)
+        return result
+
+    @holding_lock
+    def resolve_special_tables(self) -> dict:
+        with self.instrumentation.stage('resolve'):
+            return self.cached_result(('tables', ''), lambda: {
+                'kind': 'tables',
+                'tables': [self.expand_drop_table(table_name) for table_name in self.drop_table_mappings.keys()]
+            })
+
+    @holding_lock
+    def resolve(self, kind: str, query: str) -> dict:
+        # Cached results are shared between callers, only the query echoed back is per call.
+        with self.instrumentation.stage('resolve'):
+            result = self.cached_result((kind, utils.full_process(query)), lambda: self.resolve_uncached(kind, query))
+        return dict(result, query=query)
+
+    def resolve_uncached(self, kind: str, query: str) -> dict:
+        if kind == 'monster':
+            choices, resolve_match = self.monster_index, self.resolve_monster_drops
+        elif kind == 'item':
+            choices, resolve_match = self.item_index, self.resolve_item_sources
+        else:
+            raise ValueError(f"Unknown search kind '{kind}'")
+        with self.instrumentation.stage('fuzzy_match'):
+            matches = self.fuzzy_search(query.lower(), choices)
         
+        result = {'kind': kind, 'query': query, 'best_match': False, 'matches': [], 'suggestions': []}
         if matches and matches[0][1] >= 80:
-            for match, score in matches:
-                if score >= 80:
-                    monster = match
-                    print(f"\nDrops for {monster} (Match: {score}%):")
-                    print("-" * 60)
-                    print(f"{'Item':<25} {'Chance':>12} {'Quantity':>10} {'Members':>8}")
-                    print("-" * 60)
-                    special_table_references = {}
-                    for drop in self.monsters[monster]:
-                        members_str = "Yes" if drop['members'] else "No"
-                        adjusted_chance = self.reduce_to_one(drop['chance'])
-                        print(f"{drop['item']:<25} {adjusted_chance:>12} {drop['quantity']:>10} {members_str:>8}")
-                        if drop['item'].startswith('~'):
-                            nested_table = drop['item'].lstrip('~')
-                            drop_table_key = self.reverse_drop_table_mappings.get(nested_table, nested_table)
-                            if drop_table_key in self.drop_tables:
-                                special_table_references[nested_table] = (adjusted_chance, drop['members'])
-                    
-                    for table_name, (chance, is_members) in special_table_references.items():
-                        self.display_drop_table(table_name, chance, is_members)
-                    
-                    print("=" * 60)
+            result['matches'] = [resolve_match(match, score) for match, score in matches if score >= 80]
         elif matches:
-            best_match, best_score = matches[0]
-            monster = best_match
-            print(f"\nBest match for '{monster_name}':")
-            print(f"Drops for {monster} (Match: {best_score}%):")
-            print("-" * 60)
-            print(f"{'Item':<25} {'Chance':>12} {'Quantity':>10} {'Members':>8}")
-            print("-" * 60)
-            special_table_references = {}
-            for drop in self.monsters[monster]:
-                members_str = "Yes" if drop['members'] else "No"
-                adjusted_chance = self.reduce_to_one(drop['chance'])
-                print(f"{drop['item']:<25} {adjusted_chance:>12} {drop['quantity']:>10} {members_str:>8}")
-                if drop['item'].startswith('~'):
-                    nested_table = drop['item'].lstrip('~')
-                    drop_table_key = self.reverse_drop_table_mappings.get(nested_table, nested_table)
-                    if drop_table_key in self.drop_tables:
-                        special_table_references[nested_table] = (adjusted_chance, drop['members'])
-            
-            for table_name, (chance, is_members) in special_table_references.items():
-                self.display_drop_table(table_name, chance, is_members)
-            
-            print("=" * 60)
-            print(f"Note: No matches above 80%. Showing best match found.")
-            print("Did you mean one of these?")
-            for match, score in matches[1:]:
-                print(f"  {match} ({score}% match)")
-        else:
-            print(f"No matches found for '{monster_name}'")
+            result['best_match'] = True
+            result['matches'] = [resolve_match(*matches[0])]
+            result['suggestions'] = [{'name': match, 'score': score} for match, score in matches[1:]]
+        return result
+
+    @holding_lock
+    def diff(self, other: 'DropParser') -> dict:
+        if other.names is not self.names:
+            raise ValueError("Both revisions have to be loaded with the same NameTable to be compared")
+        with other.lock, self.instrumentation.stage('diff'):
+            result = self.cached_result(('diff', other.data_version), lambda: {
+                'kind': 'diff',
+                'monsters': self.diff_stores(self.store, other.store),
+                'tables': self.diff_stores(self.table_store, other.table_store),
+            })
+        return dict(result, old=self.root, new=other.root)
+
+    def diff_stores(self, old: DropStore, new: DropStore) -> List[dict]:
+        owners = []
+        owner_ids = dict.fromkeys(list(old.owner_ids) + list(new.owner_ids))
+        for owner_id in sorted(owner_ids, key=lambda owner_id: self.names[owner_id]):
+            owner = self.names[owner_id]
+            old_rows = old.rows(owner) if owner_id in old.owner_positions else range(0)
+            new_rows = new.rows(owner) if owner_id in new.owner_positions else range(0)
+            old_records, new_records = old.row_records(old_rows), new.row_records(new_rows)
+            # Names are shared between revisions, so unchanged owners compare as plain int tuples.
+            if old_records == new_records:
+                continue
+            # Scripts are walked in directory order, so the same drops can come back reordered.
+            changes = self.diff_rows(old, old_rows, old_records, new, new_rows, new_records)
+            if not changes:
+                continue
+            status = 'added' if not old_rows else 'removed' if not new_rows else 'changed'
+            owners.append({'name': owner, 'status': status, 'changes': changes})
+        return owners
 
-    def search_item(self, item_name: str) -> None:
-        item_name = item_name.lower()
-        all_items = list(self.items_to_monsters.keys())
+    def diff_rows(self, old: DropStore, old_rows: range, old_records: List[tuple], new: DropStore, new_rows: range, new_records: List[tuple]) -> List[dict]:
+        unmatched = {'old': {}, 'new': {}}
+        for side, rows, records, others in (('old', old_rows, old_records, new_records), ('new', new_rows, new_records, old_records)):
+            common = Counter(records) & Counter(others)
+            for row, record in zip(rows, records):
+                if common[record]:
+                    common[record] -= 1
+                else:
+                    unmatched[side].setdefault(record[0], []).append(row)
         
-        matches = self.fuzzy_search(item_name, all_items)
+        # Leftover rows for the same item are paired up in order, the rest were added or removed.
+        changes = []
+        for item_id in dict.fromkeys(list(unmatched['new']) + list(unmatched['old'])):
+            old_item_rows, new_item_rows = unmatched['old'].get(item_id, []), unmatched['new'].get(item_id, [])
+            for index in range(max(len(old_item_rows), len(new_item_rows))):
+                old_row = old_item_rows[index] if index < len(old_item_rows) else None
+                new_row = new_item_rows[index] if index < len(new_item_rows) else None
+                change = 'added' if old_row is None else 'removed' if new_row is None else 'changed'
+                changes.append(self.diff_entry(change, self.names[item_id], old, old_row, new, new_row))
+        return changes
+
+    def diff_entry(self, change: str, item: str, old: DropStore, old_row: int, new: DropStore, new_row: int) -> dict:
+        entry = {'change': change, 'item': item}
+        for side, store, row in (('old', old, old_row), ('new', new, new_row)):
+            entry[f'{side}_chance'] = self.row_chance(store, row) if row is not None else None
+            entry[f'{side}_rate'] = str(store.rate(row)) if row is not None else None
+            entry[f'{side}_quantity'] = store.quantity(row) if row is not None else None
+            entry[f'{side}_members'] = store.members(row) if row is not None else None
+        return entry
+
+    def run_batch(self, lines: Iterable[str], out: TextIO, default_kind: str = 'monster'):
+        # Duplicate queries in one run are resolved once whatever the result cache
+        # size or TTL, until a reload changes the data under the batch.
+        resolved = {}
+        data_version = None
+        for line_number, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                request = parse_batch_request(line, default_kind)
+                key = (request['kind'], utils.full_process(request['query']))
+                with self.lock:
+                    if data_version != self.data_version:
+                        resolved.clear()
+                        data_version = self.data_version
+                    if key not in resolved:
+                        resolved[key] = self.resolve(request['kind'], request['query'])
+                result = dict(resolved[key], query=request['query'])
+                if 'id' in request:
+                    result['id'] = request['id']
+            except ValueError as e:
+                result = {'line': line_number, 'error': str(e)}
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+
+def parse_batch_request(line: str, default_kind: str) -> dict:
+    if line.startswith('{'):
+        request = json.loads(line)
+        if not isinstance(request, dict) or not isinstance(request.get('query'), str):
+            raise ValueError("Batch requests need a string 'query'")
+        request.setdefault('kind', default_kind)
+        if request['kind'] not in ('monster', 'item'):
+            raise ValueError("Batch request 'kind' has to be 'monster' or 'item'")
+        if 'id' in request and not isinstance(request['id'], (str, int, float, bool, type(None))):
+            raise ValueError("Batch request 'id' has to be a string, number, boolean or null")
+        return request
+    kind, separator, query = line.partition(':')
+    if separator and kind.strip().lower() in ('monster', 'item'):
+        return {'kind': kind.strip().lower(), 'query': query.strip()}
+    return {'kind': default_kind, 'query': line}
+
+def table_lines(table: dict, lines: List[str]):
+    if table.get('skipped') == 'recursive':
+        lines.append(f"    (Recursive reference to {table['table']} skipped)")
+        return
+    if table.get('skipped') == 'missing':
+        lines.append(f"    (No data found for {table['table']})")
+        return
+    lines.append("")
+    lines.append(f"    {table['table']} contents (Base Chance: {table['base_chance']}):")
+    lines.append("    " + "-" * 60)
+    lines.append(f"    {'Item':<25} {'Chance':>12} {'Quantity':>10} {'Members':>8}")
+    lines.append("    " + "-" * 60)
+    for drop in table['drops']:
+        members_str = "Yes" if drop['members'] else "No"
+        lines.append(f"    {drop['item']:<25} {drop['chance']:>12} {drop['quantity']:>10} {members_str:>8}")
+        if 'table' in drop:
+            table_lines(drop['table'], lines)
+
+def match_table_lines(kind: str, match: dict, lines: List[str]):
+    if kind == 'monster':
+        lines.append(f"Drops for {match['name']} (Match: {match['score']}%):")
+        columns, rows = ('Item', 'item'), match['drops']
+    else:
+        lines.append(f"Monsters that drop {match['name']} (Match: {match['score']}%):")
+        columns, rows = ('Monster', 'monster'), match['sources']
+    lines.append("-" * 60)
+    lines.append(f"{columns[0]:<25} {'Chance':>12} {'Quantity':>10} {'Members':>8}")
+    lines.append("-" * 60)
+    for row in rows:
+        members_str = "Yes" if row['members'] else "No"
+        lines.append(f"{row[columns[1]]:<25} {row['chance']:>12} {row['quantity']:>10} {members_str:>8}")
+    for table in match.get('tables', []):
+        table_lines(table, lines)
+    current_table = None
+    for source in match.get('shared_sources', []):
+        if source['table'] != current_table:
+            current_table = source['table']
+            lines.append("-" * 60)
+            lines.append(f"Through ~{current_table}:")
+        members_str = "Yes" if source['members'] else "No"
+        lines.append(f"{source['monster']:<25} {source['chance']:>12} {source['quantity']:>10} {members_str:>8}")
+    lines.append("=" * 60)
+
+DIFF_MARKS = {'added': '+', 'removed': '-', 'changed': '~'}
+
+def diff_value(change: dict, field: str) -> str:
+    old, new = change[f'old_{field}'], change[f'new_{field}']
+    if field == 'chance' and old == new and change['old_rate'] != change['new_rate']:
+        # Different rates can round to the same 1/x, show the exact ones instead.
+        old, new = change['old_rate'], change['new_rate']
+    if field == 'members':
+        old, new = [None if value is None else "Yes" if value else "No" for value in (old, new)]
+    if old is None or new is None or old == new:
+        return new if old is None else old
+    return f"{old}->{new}"
+
+def diff_lines(result: dict, lines: List[str]):
+    lines.append("")
+    lines.append(f"Drop changes from {result['old']} to {result['new']}:")
+    if not result['monsters'] and not result['tables']:
+        lines.append("(No drops were added, removed or changed)")
+        return
+    for title, owners in (("Monster", result['monsters']), ("Shared table", result['tables'])):
+        for owner in owners:
+            lines.append("=" * 84)
+            lines.append(f"{title} {owner['name']} ({owner['status']}):")
+            lines.append("-" * 84)
+            lines.append(f"  {'Item':<25} {'Chance':>22} {'Quantity':>22} {'Members':>10}")
+            lines.append("-" * 84)
+            for change in owner['changes']:
+                lines.append(f"{DIFF_MARKS[change['change']]} {change['item']:<25} {diff_value(change, 'chance'):>22} {diff_value(change, 'quantity'):>22} {diff_value(change, 'members'):>10}")
+    lines.append("=" * 84)
+
+def render_table(result: dict) -> str:
+    lines = []
+    if result['kind'] == 'tables':
+        for table in result['tables']:
+            table_lines(table, lines)
+        return "\n".join(lines) + "\n"
+    if result['kind'] == 'diff':
+        diff_lines(result, lines)
+        return "\n".join(lines) + "\n"
+    
+    query = result['query'].lower()
+    if not result['matches']:
+        lines.append(f"No matches found for '{query}'")
+    elif result['best_match']:
+        lines.append("")
+        lines.append(f"Best match for '{query}':")
+        match_table_lines(result['kind'], result['matches'][0], lines)
+        lines.append("Note: No matches above 80%. Showing best match found.")
+        lines.append("Did you mean one of these?")
+        for suggestion in result['suggestions']:
+            lines.append(f"  {suggestion['name']} ({suggestion['score']}% match)")
+    else:
+        for match in result['matches']:
+            lines.append("")
+            match_table_lines(result['kind'], match, lines)
+    return "\n".join(lines) + "\n"
+
+def render_json(result: dict) -> str:
+    return json.dumps(result, indent=2) + "\n"
+
+def table_rows(table: dict, base_row: dict):
+    for drop in table.get('drops', []):
+        yield dict(base_row, table=table['table'], item=drop['item'], chance=drop['chance'], quantity=drop['quantity'], members=drop['members'])
+        if 'table' in drop:
+            yield from table_rows(drop['table'], base_row)
+
+def result_rows(result: dict):
+    if result['kind'] == 'tables':
+        for table in result['tables']:
+            yield from table_rows(table, {})
+        return
+    if result['kind'] == 'diff':
+        for section, owners in (('monster', result['monsters']), ('table', result['tables'])):
+            for owner in owners:
+                for change in owner['changes']:
+                    yield dict(change, section=section, name=owner['name'])
+        return
+    for match in result['matches']:
+        base_row = {'match': match['name'], 'score': match['score']}
+        if result['kind'] == 'monster':
+            for drop in match['drops']:
+                yield dict(base_row, table='', item=drop['item'], chance=drop['chance'], quantity=drop['quantity'], members=drop['members'])
+            for table in match['tables']:
+                yield from table_rows(table, base_row)
+        else:
+            for source in match['sources']:
+                yield dict(base_row, table='', monster=source['monster'], chance=source['chance'], quantity=source['quantity'], members=source['members'])
+            for source in match['shared_sources']:
+                yield dict(base_row, table=source['table'], monster=source['monster'], chance=source['chance'], quantity=source['quantity'], members=source['members'])
+
+RESULT_COLUMNS = {
+    'monster': ['match', 'score', 'table', 'item', 'chance', 'quantity', 'members'],
+    'item': ['match', 'score', 'table', 'monster', 'chance', 'quantity', 'members'],
+    'tables': ['table', 'item', 'chance', 'quantity', 'members'],
+    'diff': ['section', 'name', 'change', 'item', 'old_chance', 'new_chance', 'old_rate', 'new_rate', 'old_quantity', 'new_quantity', 'old_members', 'new_members'],
+}
+
+def render_csv(result: dict) -> str:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=RESULT_COLUMNS[result['kind']], lineterminator="\n")
+    writer.writeheader()
+    writer.writerows(result_rows(result))
+    return buffer.getvalue()
+
+def markdown_cell(value) -> str:
+    if isinstance(value, bool):
+        return "Yes" if value else "No"
+    if value is None:
+        return ""
+    return str(value).replace("|", "\\|")
+
+def markdown_table(columns: List[str], rows: Iterable[dict], lines: List[str]):
+    lines.append("| " + " | ".join(column.capitalize() for column in columns) + " |")
+    lines.append("|" + "|".join(" --- " for _ in columns) + "|")
+    for row in rows:
+        lines.append("| " + " | ".join(markdown_cell(row[column]) for column in columns) + " |")
+
+def render_markdown(result: dict) -> str:
+    lines = []
+    columns = RESULT_COLUMNS[result['kind']]
+    if result['kind'] == 'tables':
+        lines.append("## Special drop tables")
+        lines.append("")
+        markdown_table(columns, result_rows(result), lines)
+        return "\n".join(lines) + "\n"
+    if result['kind'] == 'diff':
+        lines.append(f"## Drop changes: {markdown_cell(result['old'])} to {markdown_cell(result['new'])}")
+        lines.append("")
+        if not result['monsters'] and not result['tables']:
+            lines.append("No drops were added, removed or changed.")
+        else:
+            markdown_table(columns, result_rows(result), lines)
+        return "\n".join(lines) + "\n"
+    
+    lines.append(f"## {result['kind'].capitalize()} search: {markdown_cell(result['query'])}")
+    lines.append("")
+    if not result['matches']:
+        lines.append(f"No matches found for '{markdown_cell(result['query'].lower())}'.")
+        return "\n".join(lines) + "\n"
+    for match in result['matches']:
+        lines.append(f"### {markdown_cell(match['name'])} ({match['score']}% match)")
+        lines.append("")
+        markdown_table(columns[2:], result_rows(dict(result, matches=[match])), lines)
+        lines.append("")
+    if result['best_match']:
+        lines.append("No matches above 80%, showing the best match. Did you mean one of these?")
+        lines.append("")
+        for suggestion in result['suggestions']:
+            lines.append(f"- {markdown_cell(suggestion['name'])} ({suggestion['score']}% match)")
+    return "\n".join(lines).rstrip("\n") + "\n"
+
+RENDERERS = {
+    'table': render_table,
+    'json': render_json,
+    'csv': render_csv,
+    'markdown': render_markdown,
+}
+
+CONTENT_TYPES = {
+    'table': "text/plain; charset=utf-8",
+    'json': "application/json",
+    'csv': "text/csv; charset=utf-8",
+    'markdown': "text/markdown; charset=utf-8",
+}
+
+def render_result(result: dict, output_format: str = 'table') -> str:
+    if output_format not in RENDERERS:
+        raise ValueError(f"Unknown output format '{output_format}'")
+    return RENDERERS[output_format](result)
+
+def render_stats(stats: dict) -> str:
+    lines = ["Stats:"]
+    for name, timing in stats['stages'].items():
+        calls = f"{timing['calls']} calls" if timing['calls'] != 1 else "1 call"
+        lines.append(f"  {name:<24} {timing['seconds'] * 1e3:>10.1f}ms  ({calls})")
+    for name, value in list(stats['counters'].items()) + list(stats['loaded'].items()):
+        lines.append(f"  {name:<24} {value:>10}")
+    cache = stats['result_cache']
+    lines.append(f"  {'result_cache':<24} {cache['hits']} hits, {cache['misses']} misses, {cache['evictions']} evictions, {cache['entries']}/{cache['size']} entries")
+    if stats['slowest_files']:
+        lines.append("  Slowest files:")
+        for entry in stats['slowest_files']:
+            lines.append(f"    {entry['seconds'] * 1e3:>8.2f}ms  {entry['path']}")
+    return "\n".join(lines) + "\n"
+
+class DropService:
+    def __init__(self, parser: DropParser, max_age: int = 60):
+        self.parser = parser
+        self.max_age = max_age
+        self.address = None
+        self.routes = {'/monster': 'monster', '/item': 'item', '/tables': 'tables'}
+
+    def error(self, status: HTTPStatus, message: str, headers: dict = None) -> tuple:
+        return status, json.dumps({'error': message}), {'Content-Type': CONTENT_TYPES['json'], **(headers or {})}
+
+    def dispatch(self, method: str, target: str, headers: dict) -> tuple:
+        if method not in ('GET', 'HEAD'):
+            return self.error(HTTPStatus.METHOD_NOT_ALLOWED, f"Method {method} not allowed", {'Allow': 'GET, HEAD'})
+        url = urlsplit(target)
+        if url.path.rstrip('/') == '/stats':
+            with self.parser.lock:
+                body = json.dumps(self.parser.stats())
+            return HTTPStatus.OK, body, {'Content-Type': CONTENT_TYPES['json'], 'Cache-Control': "no-store"}
+        kind = self.routes.get(url.path.rstrip('/') or '/')
+        if kind is None:
+            return self.error(HTTPStatus.NOT_FOUND, f"Unknown path '{url.path}'")
+        params = parse_qs(url.query)
+        query = params.get('q', [''])[0].strip()
+        if kind != 'tables' and not query:
+            return self.error(HTTPStatus.BAD_REQUEST, "Missing query parameter 'q'")
+        output_format = params.get('format', ['json'])[0]
+        if output_format not in RENDERERS:
+            return self.error(HTTPStatus.BAD_REQUEST, f"Unknown format '{output_format}', expected one of {', '.join(RENDERERS)}")
         
-        if matches and matches[0][1] >= 80:
-            for match, score in matches:
-                if score >= 80:
-                    item = match
-                    print(f"\nMonsters that drop {item} (Match: {score}%):")
-                    print("-" * 60)
-                    print(f"{'Monster':<25} {'Chance':>12} {'Quantity':>10} {'Members':>8}")
-                    print("-" * 60)
-                    for monster in self.items_to_monsters[item]:
-                        for drop in self.monsters[monster]:
-                            if drop['item'] == item:
-                                members_str = "Yes" if drop['members'] else "No"
-                                adjusted_chance = self.reduce_to_one(drop['chance'])
-                                print(f"{monster:<25} {adjusted_chance:>12} {drop['quantity']:>10} {members_str:>8}")
-                    print("=" * 60)
-        elif matches:
-            best_match, best_score = matches[0]
-            item = best_match
-            print(f"\nBest match for '{item_name}':")
-            print(f"Monsters that drop {item} (Match: {best_score}%):")
-            print("-" * 60)
-            print(f"{'Monster':<25} {'Chance':>12} {'Quantity':>10} {'Members':>8}")
-            print("-" * 60)
-            for monster in self.items_to_monsters[item]:
-                for drop in self.monsters[monster]:
-                    if drop['item'] == item:
-                        members_str = "Yes" if drop['members'] else "No"
-                        adjusted_chance = self.reduce_to_one(drop['chance'])
-                        print(f"{monster:<25} {adjusted_chance:>12} {drop['quantity']:>10} {members_str:>8}")
-            print("=" * 60)
-            print(f"Note: No matches above 80%. Showing best match found.")
-            print("Did you mean one of these?")
-            for match, score in matches[1:]:
-                print(f"  {match} ({score}% match)")
+        # Hold the lock so the ETag and the body always come from the same load.
+        with self.parser.lock:
+            etag = f'"{self.parser.data_version}"'
+            cache_headers = {'ETag': etag, 'Cache-Control': f"public, max-age={self.max_age}" if self.max_age > 0 else "no-cache"}
+            if etag in [tag.strip() for tag in headers.get('if-none-match', '').split(',')]:
+                return HTTPStatus.NOT_MODIFIED, None, cache_headers
+            result = self.parser.resolve_special_tables() if kind == 'tables' else self.parser.resolve(kind, query)
+        body = json.dumps(result) if output_format == 'json' else render_result(result, output_format)
+        return HTTPStatus.OK, body, {'Content-Type': CONTENT_TYPES[output_format], **cache_headers}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                if headers.get('content-length', '0').isdigit() and int(headers.get('content-length', '0')):
+                    await reader.readexactly(int(headers['content-length']))
+                
+                parts = request_line.decode('latin-1').split()
+                if len(parts) != 3:
+                    status, payload, extra_headers = self.error(HTTPStatus.BAD_REQUEST, "Malformed request line")
+                    keep_alive = False
+                else:
+                    method, target, version = parts
+                    # Resolving takes the parser lock and can be slow on a cache miss or while
+                    # a --watch reload swaps data in, so keep it off the event loop.
+                    status, payload, extra_headers = await asyncio.get_running_loop().run_in_executor(None, self.dispatch, method, target, headers)
+                    connection = headers.get('connection', '').lower()
+                    keep_alive = connection == 'keep-alive' if version == 'HTTP/1.0' else connection != 'close'
+                
+                body = b"" if payload is None else payload.encode()
+                response = [f"HTTP/1.1 {status.value} {status.phrase}"]
+                if payload is not None:
+                    response.append(f"Content-Length: {len(body)}")
+                response += [f"{name}: {value}" for name, value in extra_headers.items()]
+                response.append("Connection: keep-alive" if keep_alive else "Connection: close")
+                writer.write(("\r\n".join(response) + "\r\n\r\n").encode('latin-1'))
+                if parts[0] != 'HEAD':
+                    writer.write(body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8000):
+        server = await asyncio.start_server(self.handle, host, port)
+        # Port 0 picks a free port, so report the one that was actually bound.
+        self.address = server.sockets[0].getsockname()[:2]
+        print(f"Serving drop data on http://{host}:{self.address[1]} (/monster?q=, /item?q=, /tables)")
+        async with server:
+            await server.serve_forever()
+
+class Inotify:
+    def __init__(self, libc, fd: int):
+        self.libc = libc
+        self.fd = fd
+
+    @classmethod
+    def open(cls):
+        if not sys.platform.startswith('linux'):
+            return None
+        try:
+            libc = ctypes.CDLL(None, use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        except (OSError, AttributeError):
+            return None
+        if fd < 0:
+            return None
+        return cls(libc, fd)
+
+    def watch(self, paths: Iterable[str]):
+        for path in paths:
+            self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+
+    def wait(self, timeout: float, wake_fd: int) -> bool:
+        readable, _, _ = select.select([self.fd, wake_fd], [], [], timeout)
+        return self.fd in readable
+
+    def drain(self):
+        try:
+            while os.read(self.fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+
+    def close(self):
+        os.close(self.fd)
+
+class ScriptWatcher:
+    def __init__(self, parser: DropParser, interval: float = 2.0, settle: float = 0.25):
+        self.parser = parser
+        self.interval = interval
+        self.settle = settle
+        self.stopped = threading.Event()
+        self.inotify = Inotify.open()
+        self.wake_fd, self.stop_fd = os.pipe()
+        self.thread = threading.Thread(target=self.run, name="script-watcher", daemon=True)
+
+    def start(self) -> 'ScriptWatcher':
+        if self.inotify is not None:
+            self.inotify.watch(self.watch_paths())
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        os.write(self.stop_fd, b"\0")
+        self.thread.join()
+        if self.inotify is not None:
+            self.inotify.close()
+        os.close(self.wake_fd)
+        os.close(self.stop_fd)
+
+    def watch_paths(self) -> List[str]:
+        paths = []
+        if os.path.exists(self.parser.shared_droptables_path):
+            paths.append(self.parser.shared_droptables_path)
+        for base_path in self.parser.base_paths:
+            for root, _, _ in os.walk(base_path):
+                paths.append(root)
+        return paths
+
+    def wait(self):
+        # inotify only wakes us up early, the mtime poll still runs on every interval
+        # in case a watch was missed (new directories, replaced files, symlinks).
+        if self.inotify is None:
+            self.stopped.wait(self.interval)
+        elif self.inotify.wait(self.interval, self.wake_fd):
+            self.stopped.wait(self.settle)
+            self.inotify.drain()
+            self.inotify.watch(self.watch_paths())
+
+    def run(self):
+        while not self.stopped.is_set():
+            self.wait()
+            if self.stopped.is_set():
+                break
+            try:
+                changed = self.parser.reload()
+            except Exception as e:
+                print(f"Reload failed: {e}", file=sys.stderr)
+                continue
+            if changed:
+                print(f"Reloaded {len(changed)} changed files ({len(self.parser.monsters)} monsters, {len(self.parser.items_to_monsters)} items)", file=sys.stderr)
+
+def load_revisions(roots: Iterable[str], **options) -> List[DropParser]:
+    # Every revision gets its own index but they all intern into one NameTable,
+    # which is what lets DropParser.diff compare their drops by id.
+    names = NameTable()
+    return [DropParser(index_path=revision_index_path(root), root=root, names=names, **options) for root in roots]
+
+def run_diff(args: argparse.Namespace, workers: int):
+    for root in args.diff:
+        if not os.path.isdir(root):
+            sys.exit(f"No Server checkout found at {root}")
+    with contextlib.redirect_stdout(sys.stderr):
+        old, new = load_revisions(args.diff, workers=workers, cache_size=args.cache_size, instrument=args.stats)
+    result = old.diff(new)
+    with contextlib.ExitStack() as stack:
+        out = stack.enter_context(open(args.output, 'w')) if args.output else sys.stdout
+        out.write(render_result(result, args.format))
+    if args.stats:
+        for parser in (old, new):
+            sys.stderr.write(f"{parser.root} " + render_stats(parser.stats()))
+
+def run_loot(parser: DropParser, args: argparse.Namespace):
+    # numpy is optional, so the simulation module is only imported when it's asked for.
+    import loot
+    suggestions = None
+    with parser.lock:
+        if args.loot_all:
+            monsters = list(parser.monsters)
         else:
-            print(f"No matches found for '{item_name}'")
+            matches = parser.fuzzy_search(args.loot.lower(), parser.monster_index)
+            if not matches:
+                print(f"No matches found for '{args.loot.lower()}'")
+                return
+            monsters = [matches[0][0]]
+            # Same rule as the searches: below 80% the best match is still shown, with a note.
+            if matches[0][1] < 80:
+                suggestions = [{'name': match, 'score': score} for match, score in matches[1:]]
+        # A monster with several scripts gets a report for each, only one of them runs on a kill.
+        targets = [(monster, source) for monster in monsters for source in loot.loot_sources(parser, monster)]
+        try:
+            simulated = loot.simulate_loot(parser, targets, args.world, args.kills, args.seed) if args.simulate else [None] * len(targets)
+        except RuntimeError as e:
+            sys.exit(str(e))
+        jsonl = args.loot_all or args.format == 'json'
+        with contextlib.ExitStack() as stack:
+            out = stack.enter_context(open(args.output, 'w')) if args.output else sys.stdout
+            if suggestions is not None and not jsonl:
+                out.write(f"\nBest match for '{args.loot.lower()}' ({matches[0][1]}% match):\n")
+            for (monster, source), simulation in zip(targets, simulated):
+                report = loot.loot_report(parser, monster, args.world, args.kills, args.drops, source)
+                if jsonl:
+                    if suggestions is not None:
+                        report = dict(report, query=args.loot, best_match=True, suggestions=suggestions)
+                    out.write(json.dumps(dict(report, simulated=simulation)) + "\n")
+                else:
+                    out.write(loot.render_loot_report(report, simulation))
+            if suggestions is not None and not jsonl:
+                out.write("Note: No matches above 80%. Showing best match found.\n")
+                out.write("Did you mean one of these?\n")
+                out.write("".join(f"  {suggestion['name']} ({suggestion['score']}% match)\n" for suggestion in suggestions))
 
 def main():
-    parser = DropParser()
+    arg_parser = argparse.ArgumentParser(description="Search the 2004Scape drop tables.")
+    arg_parser.add_argument('--root', default="Server", metavar='DIR', help="Server checkout to load the scripts from (default: Server)")
+    arg_parser.add_argument('--diff', nargs=2, metavar=('OLD', 'NEW'), help="load two Server checkouts and print the drops that were added, removed or changed between them")
+    arg_parser.add_argument('--parallel', action='store_true', help="parse changed scripts across a pool of worker processes")
+    arg_parser.add_argument('--workers', type=int, default=None, help="number of worker processes for --parallel, implies --parallel (default: CPU count)")
+    arg_parser.add_argument('--build-index', action='store_true', help="refresh drop_index.json and exit without starting the menu")
+    arg_parser.add_argument('--batch', metavar='FILE', help="resolve newline or JSONL delimited queries from FILE ('-' for stdin) and write JSONL results")
+    arg_parser.add_argument('--format', choices=list(RENDERERS), default='table', help="how the menu prints results: the usual table, json, csv or markdown (default: table)")
+    arg_parser.add_argument('--batch-kind', choices=['monster', 'item'], default='monster', help="search kind for batch lines without a 'monster:' or 'item:' prefix")
+    arg_parser.add_argument('--output', metavar='FILE', help="write batch, loot or diff results to FILE instead of stdout")
+    arg_parser.add_argument('--serve', action='store_true', help="serve /monster?q=, /item?q=, /tables and /stats as JSON over HTTP instead of starting the menu")
+    arg_parser.add_argument('--host', default="127.0.0.1", help="address for --serve to listen on (default: 127.0.0.1)")
+    arg_parser.add_argument('--port', type=int, default=8000, help="port for --serve to listen on (default: 8000)")
+    arg_parser.add_argument('--cache-size', type=int, default=256, help="number of resolved searches to keep in the result cache, 0 to disable (default: 256)")
+    arg_parser.add_argument('--cache-ttl', type=float, default=None, metavar='SECONDS', help="drop cached searches after this many seconds (default: keep until the scripts change)")
+    arg_parser.add_argument('--loot', metavar='MONSTER', help="print the expected loot and kill counts for a monster instead of starting the menu")
+    arg_parser.add_argument('--loot-all', action='store_true', help="write expected loot for every monster as JSONL")
+    arg_parser.add_argument('--kills', type=int, default=1000, help="number of kills for --loot (default: 1000)")
+    arg_parser.add_argument('--drops', type=int, default=1, help="kill counts for --loot are for getting at least this many drops (default: 1)")
+    arg_parser.add_argument('--world', choices=WORLDS, default='members', help="only count drops that can happen on members or free worlds (default: members)")
+    arg_parser.add_argument('--simulate', action='store_true', help="also simulate --kills kills per monster with numpy and show the simulated totals")
+    arg_parser.add_argument('--seed', type=int, default=None, help="random seed for --simulate")
+    arg_parser.add_argument('--stats', action='store_true', help="time each load and search stage and print the stats to stderr (also served at /stats)")
+    arg_parser.add_argument('--watch', action='store_true', help="reload changed scripts in the background while the menu or batch is running")
+    arg_parser.add_argument('--watch-interval', type=float, default=2.0, metavar='SECONDS', help="how often --watch checks the scripts for changes (default: 2)")
+    args = arg_parser.parse_args()
+    
+    if args.workers is not None and args.workers < 1:
+        arg_parser.error("--workers must be at least 1")
+    workers = (args.workers or os.cpu_count() or 1) if args.parallel or args.workers else 1
+    if args.diff:
+        run_diff(args, workers)
+        return
+    index_path = revision_index_path(args.root)
+    if args.batch:
+        with contextlib.redirect_stdout(sys.stderr):
+            parser = DropParser(index_path=index_path, workers=workers, cache_size=args.cache_size, cache_ttl=args.cache_ttl, root=args.root, instrument=args.stats)
+        with contextlib.ExitStack() as stack:
+            if args.watch:
+                stack.callback(ScriptWatcher(parser, args.watch_interval).start().stop)
+            lines = sys.stdin if args.batch == '-' else stack.enter_context(open(args.batch, 'r'))
+            out = stack.enter_context(open(args.output, 'w')) if args.output else sys.stdout
+            parser.run_batch(lines, out, args.batch_kind)
+        if args.stats:
+            sys.stderr.write(render_stats(parser.stats()))
+        return
+    
+    parser = DropParser(index_path=index_path, workers=workers, cache_size=args.cache_size, cache_ttl=args.cache_ttl, root=args.root, instrument=args.stats)
+    if args.stats:
+        sys.stderr.write(render_stats(parser.stats()))
+    if args.build_index:
+        return
+    if args.loot or args.loot_all:
+        run_loot(parser, args)
+        return
+    if args.watch:
+        ScriptWatcher(parser, args.watch_interval).start()
+    if args.serve:
+        # With --watch the data can change under a client, so make it revalidate every time.
+        service = DropService(parser, max_age=0 if args.watch else 60)
+        try:
+            asyncio.run(service.serve(args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+        return
     
     while True:
         print("\n1. Search by monster")
@@ -407,13 +1783,15 @@ def main():
         
         if choice == '1':
             monster = input("Enter monster name: ")
-            parser.search_monster(monster)
+            parser.search_monster(monster, args.format)
         elif choice == '2':
             item = input("Enter item name: ")
-            parser.search_item(item)
+            parser.search_item(item, args.format)
         elif choice == '3':
-            parser.show_special_tables()
+            parser.show_special_tables(args.format)
         elif choice == '4':
+            if args.stats:
+                sys.stderr.write(render_stats(parser.stats()))
             print("Goodbye!")
             break
         else:
@@ -0,0 +1,91 @@
+"""Compare scan_drop_script against the original split/findall parser.
+
+Run from the repository root:
+
+    py -m benchmarks.bench_scanner --files 5000
+"""
+import argparse
+import os
+import re
+import tempfile
+import time
+
+from app import DropParser, scan_drop_script
+from benchmarks.corpus import generate_corpus
+
+
+def legacy_scan_drop_script(content: str, is_drop_table: bool = False) -> list:
+    drops = []
+    if not is_drop_table and 'npc_param(death_drop)' in content:
+        drops.append({'item': 'default_drop', 'chance': '1/1', 'quantity': '1', 'members': False, 'rarity': 'Common'})
+
+    blocks = re.split(r'(?:else\s*)?if\s*\(\$random\s*<\s*(\d+)\)', content)
+    if len(blocks) > 1:
+        blocks = blocks[1:]
+        previous_chance = 0
+
+        for i in range(0, len(blocks), 2):
+            upper_bound = int(blocks[i])
+            block_content = blocks[i + 1]
+            is_members = 'map_members = true' in block_content
+
+            drop_matches = re.findall(
+                r'obj_add\(npc_coord,\s*([^,]+)(?:,\s*([^,]+))?(?:,\s*\^lootdrop_duration\))?',
+                block_content
+            )
+            for match in drop_matches:
+                item = match[0].strip()
+                quantity = match[1].strip() if len(match) > 1 and match[1] else '1'
+                successes = upper_bound - previous_chance
+                if successes <= 0:
+                    continue
+                chance = f"{successes}/128"
+                if item.startswith('~'):
+                    drops.append({'item': item, 'chance': chance, 'quantity': '1', 'members': is_members, 'rarity': 'Common'})
+                else:
+                    drops.append({'item': item, 'chance': chance, 'quantity': DropParser.parse_quantity(quantity), 'members': is_members, 'rarity': 'Common'})
+                previous_chance = upper_bound
+    return drops
+
+
+def best_time(func, contents, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for content in contents:
+            func(content)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark the drop script scanner against the legacy parser.")
+    arg_parser.add_argument('--files', type=int, default=5000, help="number of synthetic scripts to generate")
+    arg_parser.add_argument('--repeat', type=int, default=5, help="runs per implementation, the best is reported")
+    arg_parser.add_argument('--drop-ratio', type=float, default=0.4, help="fraction of scripts that are npc death scripts")
+    arg_parser.add_argument('--seed', type=int, default=2004)
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        paths = generate_corpus(os.path.join(temp_dir, 'Server'), files=args.files, seed=args.seed, drop_ratio=args.drop_ratio)
+        contents = []
+        for path in paths:
+            with open(path, 'r') as f:
+                contents.append(f.read())
+
+    mismatches = sum(1 for content in contents if scan_drop_script(content) != legacy_scan_drop_script(content))
+    total_bytes = sum(len(content) for content in contents)
+    legacy = best_time(legacy_scan_drop_script, contents, args.repeat)
+    scanner = best_time(scan_drop_script, contents, args.repeat)
+
+    print(f"Corpus: {len(contents)} files, {total_bytes / 1e6:.1f} MB")
+    print(f"Mismatched files: {mismatches}")
+    print(f"{'Parser':<12} {'Total':>10} {'Per file':>12}")
+    print(f"{'legacy':<12} {legacy * 1e3:>8.1f}ms {legacy / len(contents) * 1e6:>10.1f}us")
+    print(f"{'scanner':<12} {scanner * 1e3:>8.1f}ms {scanner / len(contents) * 1e6:>10.1f}us")
+    print(f"Speedup: {legacy / scanner:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Generate synthetic 2004Scape-shaped script trees for benchmarking.
+
+The layout mirrors a Server checkout: npc scripts under
+data/src/scripts/areas and data/src/scripts/drop tables/scripts, plus
+shared_droptables.rs2. Roughly `drop_ratio` of the files are npc death
+scripts with `if ($random < N)` ladders, the rest are dialogue/area scripts
+with no drops at all.
+"""
+import os
+import random
+from typing import List
+
+ITEMS = [
+    'coins', 'bones', 'big_bones', 'air_rune', 'water_rune', 'earth_rune', 'fire_rune', 'mind_rune',
+    'body_rune', 'chaos_rune', 'cosmic_rune', 'nature_rune', 'law_rune', 'death_rune', 'blood_rune',
+    'bronze_sq_shield', 'bronze_spear', 'iron_dagger', 'iron_arrow', 'steel_axe', 'steel_longsword',
+    'mithril_bar', 'adamant_kiteshield', 'rune_spear', 'rune_2h_sword', 'dragon_medium', 'feather',
+    'raw_chicken', 'cowhide', 'goblin_mail', 'uncut_sapphire', 'jug', 'tinderbox', 'bread', 'cabbage',
+]
+SHARED_TABLES = ['~randomherb', '~randomjewel', '~ultrarare_getitem']
+MONSTERS = [
+    'goblin', 'chaos_druid', 'dark_wizard', 'man', 'woman', 'guard', 'hill_giant', 'moss_giant',
+    'lesser_demon', 'greater_demon', 'black_knight', 'white_knight', 'skeleton', 'zombie', 'ghost',
+    'giant_rat', 'cow', 'chicken', 'barbarian', 'druid', 'monk', 'thief', 'mugger', 'jail_guard',
+    'ice_warrior', 'ice_giant', 'fire_giant', 'black_demon', 'red_dragon', 'blue_dragon',
+    'green_dragon', 'baby_blue_dragon', 'chaos_dwarf', 'dwarf', 'gnome', 'imp', 'unicorn', 'bear',
+]
+HERBS = ['guam', 'marrentill', 'tarromin', 'harralander', 'ranarr', 'irit', 'avantoe', 'kwuarm', 'cadantine']
+
+SHARED_DROPTABLES = '''[proc,randomherb]()(namedobj, int)
+if (map_members = false) {
+    return(coins, 5);
+}
+def_int $random = random(128);
+%(herbs)s
+return(unidentified_dwarf_weed, 1);
+
+[proc,randomjewel]()(namedobj, int)
+def_int $random = random(128);
+if ($random < 32) {
+    return(uncut_sapphire, 1);
+} else if ($random < 48) {
+    return(uncut_emerald, 1);
+} else if ($random < 56) {
+    return(uncut_ruby, 1);
+} else if ($random < 58) {
+    return(uncut_diamond, 1);
+} else if ($random < 60) {
+    return(~ultrarare_getitem);
+}
+return(null, 0);
+
+[proc,ultrarare_getitem]()(namedobj, int)
+switch_int (random(%(rare_max)d)) {
+%(rares)s
+    case default : return(coins, 1);
+}
+'''
+
+
+def script_dirs(root: str) -> List[str]:
+    scripts = os.path.join(root, 'data', 'src', 'scripts')
+    return [os.path.join(scripts, 'drop tables', 'scripts'), os.path.join(scripts, 'areas')]
+
+
+def shared_droptables_path(root: str) -> str:
+    return os.path.join(script_dirs(root)[0], 'shared_droptables.rs2')
+
+
+def drop_script(rng: random.Random, npc: str) -> str:
+    lines = [f'[ai_queue3,{npc}]', 'gosub(npc_death);', 'if (npc_findhero = false) {', '    return;', '}']
+    if rng.random() < 0.7:
+        lines.append('obj_add(npc_coord, npc_param(death_drop), 1, ^lootdrop_duration);')
+    lines.append('def_int $random = random(128);')
+    bound = 0
+    for branch in range(rng.randint(1, 14)):
+        bound += rng.randint(1, 10)
+        if bound >= 128:
+            break
+        lines.append(('if' if branch == 0 else '} else if') + f' ($random < {bound}) {{')
+        members = rng.random() < 0.2
+        indent = '        ' if members else '    '
+        if members:
+            lines.append('    if (map_members = true) {')
+        roll = rng.random()
+        if roll < 0.15:
+            lines.append(f'{indent}obj_add(npc_coord, {rng.choice(SHARED_TABLES)}, ^lootdrop_duration);')
+        elif roll < 0.3:
+            quantity = f'calc(random({rng.randint(1, 20)}) + {rng.randint(1, 10)})'
+            lines.append(f'{indent}obj_add(npc_coord, {rng.choice(ITEMS)}, {quantity}, ^lootdrop_duration);')
+        else:
+            lines.append(f'{indent}obj_add(npc_coord, {rng.choice(ITEMS)}, {rng.randint(1, 30)}, ^lootdrop_duration);')
+        if members:
+            lines.append('    }')
+    lines.append('}')
+    return '\n'.join(lines) + '\n'
+
+
+def area_script(rng: random.Random, npc: str) -> str:
+    triggers = []
+    for i in range(rng.randint(5, 80)):
+        triggers.append(
+            f'[opnpc1,{npc}_{i}]\n'
+            f'~chatnpc("<p,neutral>Hello there, adventurer. Nice weather for the time of year.");\n'
+            f'if (%{npc}_progress < {i}) {{\n'
+            f'    mes("Nothing interesting happens.");\n'
+            f'    return;\n'
+            f'}}\n'
+            f'~chatplayer("<p,happy>Thanks, see you around!");\n'
+        )
+    return '\n'.join(triggers)
+
+
+def shared_droptables(rng: random.Random) -> str:
+    herbs = []
+    bound = 0
+    for i, herb in enumerate(HERBS):
+        bound += max(1, 32 - 3 * i)
+        herbs.append(('if' if i == 0 else '} else if') + f' ($random < {bound}) {{\n    return(unidentified_{herb}, 1);')
+    rares = [f'    case {i} : return({item}, 1);' for i, item in enumerate(['rune_spear', 'dragon_medium', 'rune_2h_sword', 'rune_battleaxe'])]
+    return SHARED_DROPTABLES % {'herbs': '\n'.join(herbs) + '\n}', 'rare_max': rng.choice([63, 127]), 'rares': '\n'.join(rares)}
+
+
+def generate_corpus(root: str, files: int = 5000, seed: int = 2004, drop_ratio: float = 0.4) -> List[str]:
+    rng = random.Random(seed)
+    drop_tables_dir, areas_dir = script_dirs(root)
+    written = []
+    for i in range(files):
+        npc = rng.choice(MONSTERS) if rng.random() < 0.5 else f'npc_{i}'
+        if rng.random() < 0.7:
+            directory = os.path.join(areas_dir, f'area_{i % 97}', 'scripts')
+        else:
+            directory = os.path.join(drop_tables_dir, f'group_{i % 11}')
+        os.makedirs(directory, exist_ok=True)
+        if rng.random() < drop_ratio:
+            path = os.path.join(directory, f'{npc}.rs2')
+            if os.path.exists(path):
+                path = os.path.join(directory, f'{npc}_{i}.rs2')
+            text = drop_script(rng, npc)
+        else:
+            path, text = os.path.join(directory, f'{npc}_{i}.rs2'), area_script(rng, npc)
+        with open(path, 'w') as f:
+            f.write(text)
+        written.append(path)
+    with open(shared_droptables_path(root), 'w') as f:
+        f.write(shared_droptables(rng))
+    return written
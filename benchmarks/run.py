@@ -0,0 +1,229 @@
+"""Time parsing, warm start and queries on a synthetic Server checkout.
+
+Run from the repository root:
+
+    py -m benchmarks.run --files 20000 --output bench.json
+
+Stages, in order: cold_parse (no drop index yet), warm_start (index written
+by the cold parse), monster_queries and item_queries (resolve plus table
+rendering with the result cache off, reported as latency percentiles) and
+special_tables. Every stage records its wall time and its own peak traced
+Python memory (tracemalloc, with the peak reset at the start of the stage),
+plus the process peak RSS where the platform has it. --no-memory skips the
+tracing for cleaner timings. --cprofile DIR and --tracemalloc DIR additionally
+dump a .prof file / top allocation report per stage.
+"""
+import argparse
+import contextlib
+import cProfile
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from app import DropParser, render_table
+from benchmarks.corpus import generate_corpus
+
+
+def peak_rss_mb():
+    # Lifetime peak of the whole process, so later stages can only repeat or raise it.
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes everywhere else.
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+
+    def at(fraction):
+        return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1e3, 3)
+
+    return {
+        'count': len(ordered),
+        'mean_ms': round(sum(ordered) / len(ordered) * 1e3, 3),
+        'p50_ms': at(0.5),
+        'p90_ms': at(0.9),
+        'p99_ms': at(0.99),
+        'max_ms': round(ordered[-1] * 1e3, 3),
+    }
+
+
+def make_queries(names, count, rng):
+    names = [name for name in names if not name.startswith('~')]
+    queries = []
+    for _ in range(count):
+        name = rng.choice(names)
+        style = rng.random()
+        if style < 0.4:
+            query = name
+        elif style < 0.6:
+            query = name.replace('_', ' ').upper()
+        elif style < 0.8 and len(name) > 3:
+            cut = rng.randrange(len(name))
+            query = name[:cut] + name[cut + 1:]
+        elif style < 0.9:
+            query = rng.choice(name.split('_'))
+        else:
+            query = ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(3, 10)))
+        queries.append(query)
+    return queries
+
+
+class StageRunner:
+    def __init__(self, cprofile_dir=None, tracemalloc_dir=None, memory=True):
+        self.cprofile_dir = cprofile_dir
+        self.tracemalloc_dir = tracemalloc_dir
+        self.memory = memory or bool(tracemalloc_dir)
+        self.stages = {}
+        for directory in (cprofile_dir, tracemalloc_dir):
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        if self.memory:
+            tracemalloc.start()
+
+    def close(self):
+        if self.memory:
+            tracemalloc.stop()
+
+    def run(self, name, func):
+        profiler = cProfile.Profile() if self.cprofile_dir else None
+        if self.memory:
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+        baseline = tracemalloc.take_snapshot() if self.tracemalloc_dir else None
+        start = time.perf_counter()
+        if profiler:
+            profiler.enable()
+        try:
+            result, stats = func()
+        finally:
+            if profiler:
+                profiler.disable()
+            elapsed = time.perf_counter() - start
+
+        stats = dict(stats, seconds=round(elapsed, 4))
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            stats['peak_mb'] = round(peak / 2 ** 20, 1)
+            stats['retained_mb'] = round((current - before) / 2 ** 20, 1)
+        stats['process_peak_rss_mb'] = peak_rss_mb()
+        if profiler:
+            stats['cprofile'] = os.path.join(self.cprofile_dir, f'{name}.prof')
+            profiler.dump_stats(stats['cprofile'])
+        if self.tracemalloc_dir:
+            snapshot = tracemalloc.take_snapshot()
+            stats['tracemalloc'] = os.path.join(self.tracemalloc_dir, f'{name}.txt')
+            with open(stats['tracemalloc'], 'w') as f:
+                for line in snapshot.compare_to(baseline, 'lineno')[:25]:
+                    f.write(f'{line}\n')
+        self.stages[name] = stats
+        print(f"{name:<16} {elapsed:>8.3f}s", file=sys.stderr)
+        return result
+
+
+def load_parser(root, index_path, workers):
+    with contextlib.redirect_stdout(io.StringIO()):
+        parser = DropParser(index_path=index_path, workers=workers, cache_size=0, root=root)
+    counts = {'monsters': len(parser.monsters), 'items': len(parser.items_to_monsters), 'tables': len(parser.drop_tables)}
+    return parser, counts
+
+
+def time_queries(parser, kind, queries):
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        render_table(parser.resolve(kind, query))
+        samples.append(time.perf_counter() - start)
+    return None, percentiles(samples)
+
+
+def time_special_tables(parser, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        render_table(parser.resolve_special_tables())
+        samples.append(time.perf_counter() - start)
+    return None, percentiles(samples)
+
+
+def run(args, corpus_dir):
+    root = os.path.join(corpus_dir, 'Server')
+    if not os.path.isdir(root):
+        generate_corpus(root, files=args.files, seed=args.seed, drop_ratio=args.drop_ratio)
+    index_path = os.path.join(corpus_dir, 'drop_index.json')
+    if os.path.exists(index_path):
+        os.remove(index_path)
+
+    runner = StageRunner(args.cprofile, args.tracemalloc, memory=not args.no_memory)
+    try:
+        runner.run('cold_parse', lambda: load_parser(root, index_path, args.workers))
+        parser = runner.run('warm_start', lambda: load_parser(root, index_path, args.workers))
+        rng = random.Random(args.seed)
+        monster_queries = make_queries(list(parser.monsters), args.queries, rng)
+        item_queries = make_queries(list(parser.items_to_monsters), args.queries, rng)
+        runner.run('monster_queries', lambda: time_queries(parser, 'monster', monster_queries))
+        runner.run('item_queries', lambda: time_queries(parser, 'item', item_queries))
+        runner.run('special_tables', lambda: time_special_tables(parser, args.queries))
+    finally:
+        runner.close()
+
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'corpus': {
+            'files': sum(len(files) for _, _, files in os.walk(root)),
+            'bytes': sum(os.path.getsize(os.path.join(path, name)) for path, _, files in os.walk(root) for name in files),
+            'seed': args.seed,
+            'drop_ratio': args.drop_ratio,
+            'monsters': len(parser.monsters),
+            'items': len(parser.items_to_monsters),
+            'tables': len(parser.drop_tables),
+        },
+        'workers': args.workers,
+        'profiled': bool(args.cprofile or args.tracemalloc),
+        'memory_traced': runner.memory,
+        'stages': runner.stages,
+    }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark parse, warm start and query latency on a synthetic corpus.")
+    arg_parser.add_argument('--files', type=int, default=5000, help="number of synthetic scripts to generate")
+    arg_parser.add_argument('--drop-ratio', type=float, default=0.4, help="fraction of scripts that are npc death scripts")
+    arg_parser.add_argument('--seed', type=int, default=2004)
+    arg_parser.add_argument('--queries', type=int, default=500, help="queries per search kind")
+    arg_parser.add_argument('--workers', type=int, default=1, help="parse workers for the cold parse")
+    arg_parser.add_argument('--corpus', metavar='DIR', help="keep the generated corpus in DIR and reuse it on later runs")
+    arg_parser.add_argument('--output', metavar='FILE', help="write the JSON results to FILE instead of stdout")
+    arg_parser.add_argument('--cprofile', metavar='DIR', help="dump a cProfile .prof file per stage into DIR")
+    arg_parser.add_argument('--no-memory', action='store_true', help="skip the per-stage tracemalloc peaks, which slow every stage down")
+    arg_parser.add_argument('--tracemalloc', metavar='DIR', help="trace allocations and dump the top sites per stage into DIR")
+    args = arg_parser.parse_args()
+
+    if args.corpus:
+        results = run(args, args.corpus)
+    else:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            results = run(args, temp_dir)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
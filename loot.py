@@ -0,0 +1,218 @@
+import math
+from fractions import Fraction
+from typing import Dict, Iterable, List
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+KILL_CHANCES = (0.5, 0.9, 0.99)
+
+def quantity_bounds(quantity: str) -> tuple:
+    # Ranges come from calc(random(n) + offset) and are shown as offset-(offset + n),
+    # but random(n) rolls 0..n-1 so the highest quantity is one less than shown.
+    low, separator, high = quantity.partition('-')
+    if not separator:
+        return int(low), int(low)
+    low, high = int(low), int(high)
+    return low, max(low, high - 1)
+
+def mean_quantity(quantity: str) -> Fraction:
+    low, high = quantity_bounds(quantity)
+    return Fraction(low + high, 2)
+
+def binomial_at_least(kills: int, p: float, drops: int) -> float:
+    log_p, log_q = math.log(p), math.log1p(-p)
+    below = 0.0
+    for successes in range(drops):
+        below += math.exp(
+            math.lgamma(kills + 1) - math.lgamma(successes + 1) - math.lgamma(kills - successes + 1)
+            + successes * log_p + (kills - successes) * log_q
+        )
+    return 1.0 - below
+
+def kills_for_chance(p: float, chance: float, drops: int = 1) -> int:
+    if p <= 0:
+        return None
+    if p >= 1:
+        return drops
+    if drops == 1:
+        return max(1, math.ceil(math.log1p(-chance) / math.log1p(-p)))
+    low, high = drops, drops
+    while binomial_at_least(high, p, drops) < chance:
+        low, high = high, high * 2
+    while low < high:
+        middle = (low + high) // 2
+        if binomial_at_least(middle, p, drops) >= chance:
+            high = middle
+        else:
+            low = middle + 1
+    return low
+
+def loot_sources(parser, monster: str) -> List[str]:
+    return parser.store.sources(monster) or [None]
+
+class LootModel:
+    def __init__(self, parser, monster: str, world: str = 'members', source: str = None):
+        store = parser.store
+        sources = store.sources(monster)
+        # Every script for a monster is its own death handler (a variant or an area)
+        # and only one of them runs on a kill, so a model covers a single script.
+        if source is None and len(sources) > 1:
+            raise ValueError(f"{monster} drops from {len(sources)} scripts, pick one of {', '.join(sources)}")
+        self.monster = monster
+        self.world = world
+        self.source = source if source is not None else next(iter(sources), None)
+        # Each roll is independent and holds mutually exclusive outcomes. Guaranteed
+        # rows (the death drop, 1/1 tables) roll on their own, the rest of the script
+        # is one $random ladder.
+        self.rolls: List[Dict[tuple, Fraction]] = []
+        ladder: Dict[tuple, Fraction] = {}
+        for row in store.source_rows(self.source) if self.source is not None else store.rows(monster):
+            chance = store.rate(row)
+            if not chance or not store.in_world(row, world):
+                continue
+            roll = {} if chance == 1 else ladder
+            for key, rate in parser.row_outcomes(row, world).items():
+                roll[key] = roll.get(key, 0) + chance * rate
+            if roll is not ladder:
+                self.rolls.append(roll)
+        if ladder:
+            self.rolls.append(ladder)
+
+    def items(self) -> List[str]:
+        return list(dict.fromkeys(item for roll in self.rolls for item, _, _ in roll))
+
+    def drop_chances(self) -> Dict[str, Fraction]:
+        missed: Dict[str, Fraction] = {}
+        for roll in self.rolls:
+            per_item: Dict[str, Fraction] = {}
+            for (item, _, _), rate in roll.items():
+                per_item[item] = per_item.get(item, 0) + rate
+            for item, rate in per_item.items():
+                missed[item] = missed.get(item, Fraction(1)) * (1 - min(rate, Fraction(1)))
+        return {item: 1 - chance for item, chance in missed.items()}
+
+    def expected_quantities(self) -> Dict[str, Fraction]:
+        expected: Dict[str, Fraction] = {}
+        for roll in self.rolls:
+            for (item, quantity, _), rate in roll.items():
+                expected[item] = expected.get(item, 0) + rate * mean_quantity(quantity)
+        return expected
+
+def loot_report(parser, monster: str, world: str = 'members', kills: int = 1000, drops: int = 1, source: str = None) -> dict:
+    model = LootModel(parser, monster, world, source)
+    chances = model.drop_chances()
+    expected = model.expected_quantities()
+    items = []
+    for item in sorted(model.items(), key=lambda item: -chances[item]):
+        chance = chances[item]
+        items.append({
+            'item': item,
+            'chance': parser.format_rate(chance) if chance else "0/1",
+            'rate': str(chance),
+            'expected_per_kill': str(expected[item]),
+            'expected': round(float(expected[item] * kills), 3),
+            'mean_kills': round(float(drops / chance), 1) if chance else None,
+            'kills_for_chance': {f"{round(target * 100)}%": kills_for_chance(float(chance), target, drops) for target in KILL_CHANCES},
+        })
+    return {'monster': monster, 'source': model.source, 'world': world, 'kills': kills, 'drops': drops, 'items': items}
+
+class LootSimulator:
+    def __init__(self, models: List[LootModel]):
+        if np is None:
+            raise RuntimeError("Monte Carlo simulation needs numpy, install it with 'pip install numpy'")
+        self.models = models
+        self.item_names = list(dict.fromkeys(item for model in models for item in model.items()))
+        item_ids = {item: item_id for item_id, item in enumerate(self.item_names)}
+
+        # Only the totals and drop counts over all kills are reported, so every roll is
+        # sampled once as a multinomial over its outcomes plus a "nothing" column instead
+        # of drawing each kill. Ranged quantities still add one uniform draw per hit.
+        width = max((len(roll) for model in models for roll in model.rolls), default=0) + 1
+        roll_models, pvals, outcome_items, outcome_lows, outcome_spans = [], [], [], [], []
+        for model_id, model in enumerate(models):
+            for roll in model.rolls:
+                roll_models.append(model_id)
+                row = [0.0] * width
+                items, lows, spans = [-1] * width, [0] * width, [1] * width
+                for column, ((item, quantity, _), rate) in enumerate(roll.items()):
+                    low, high = quantity_bounds(quantity)
+                    row[column] = float(rate)
+                    items[column], lows[column], spans[column] = item_ids[item], low, high - low + 1
+                row[-1] = max(0.0, 1.0 - float(sum(roll.values())))
+                pvals.append(row)
+                outcome_items.append(items)
+                outcome_lows.append(lows)
+                outcome_spans.append(spans)
+        self.roll_models = np.array(roll_models, dtype=np.int64)
+        self.pvals = np.array(pvals, dtype=np.float64).reshape(-1, width)
+        self.pvals /= self.pvals.sum(axis=1, keepdims=True)
+        self.outcome_items = np.array(outcome_items, dtype=np.int64).reshape(-1, width)
+        self.outcome_lows = np.array(outcome_lows, dtype=np.int64).reshape(-1, width)
+        self.outcome_spans = np.array(outcome_spans, dtype=np.int64).reshape(-1, width)
+
+    def run(self, kills: int, seed: int = None, chunk_draws: int = 1 << 22) -> tuple:
+        rng = np.random.default_rng(seed)
+        cells = len(self.models) * len(self.item_names)
+        if len(self.roll_models) == 0:
+            empty = np.zeros((len(self.models), len(self.item_names)), dtype=np.int64)
+            return empty, empty.copy()
+
+        counts = rng.multinomial(kills, self.pvals)
+        totals = counts * self.outcome_lows
+        for roll, column in zip(*np.nonzero((counts > 0) & (self.outcome_spans > 1))):
+            span, remaining = self.outcome_spans[roll, column], int(counts[roll, column])
+            while remaining > 0:
+                batch = min(remaining, chunk_draws)
+                remaining -= batch
+                totals[roll, column] += int(rng.integers(0, span, batch).sum())
+
+        hit = self.outcome_items >= 0
+        cell = (np.broadcast_to(self.roll_models[:, None], hit.shape) * len(self.item_names) + self.outcome_items)[hit]
+        drops = np.bincount(cell, weights=counts[hit], minlength=cells).astype(np.int64)
+        totals = np.bincount(cell, weights=totals[hit], minlength=cells).astype(np.int64)
+        return totals.reshape(len(self.models), -1), drops.reshape(len(self.models), -1)
+
+def simulate_loot(parser, targets: Iterable[tuple], world: str = 'members', kills: int = 1000, seed: int = None) -> List[dict]:
+    # Targets are (monster, source) pairs, see loot_sources.
+    models = [LootModel(parser, monster, world, source) for monster, source in targets]
+    simulator = LootSimulator(models)
+    totals, drops = simulator.run(kills, seed)
+    results = []
+    for model_id, model in enumerate(models):
+        items = {}
+        for item_id in np.flatnonzero(drops[model_id]):
+            items[simulator.item_names[item_id]] = {
+                'total': int(totals[model_id, item_id]),
+                'drops': int(drops[model_id, item_id]),
+                'per_kill': float(totals[model_id, item_id]) / kills,
+            }
+        results.append({'monster': model.monster, 'source': model.source, 'world': world, 'kills': kills, 'items': items})
+    return results
+
+def render_loot_report(report: dict, simulated: dict = None) -> str:
+    chance_columns = list(report['items'][0]['kills_for_chance']) if report['items'] else [f"{round(target * 100)}%" for target in KILL_CHANCES]
+    width = 25 + 13 + 13 + (13 if simulated is not None else 0) + 9 * len(chance_columns)
+    lines = [f"\nLoot for {report['monster']} on {report['world']} worlds over {report['kills']} kills:"]
+    if report['source'] is not None:
+        lines.append(f"From {report['source']}")
+    lines.append("-" * width)
+    header = f"{'Item':<25} {'Chance':>12} {'Expected':>12}"
+    if simulated is not None:
+        header += f" {'Simulated':>12}"
+    header += "".join(f" {column:>8}" for column in chance_columns)
+    lines.append(header)
+    lines.append("-" * width)
+    for entry in report['items']:
+        line = f"{entry['item']:<25} {entry['chance']:>12} {entry['expected']:>12.2f}"
+        if simulated is not None:
+            line += f" {simulated['items'].get(entry['item'], {}).get('total', 0):>12}"
+        line += "".join(f" {entry['kills_for_chance'][column] or '-':>8}" for column in chance_columns)
+        lines.append(line)
+    if not report['items']:
+        lines.append(f"(No drops for {report['monster']} on {report['world']} worlds)")
+    lines.append("-" * width)
+    lines.append(f"Kill columns: kills needed for that chance of at least {report['drops']} drop(s).")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,78 @@
+import contextlib
+import io
+import os
+
+import pytest
+
+from app import load_revisions
+
+
+def write_script(root, directory, name, text):
+    path = os.path.join(root, 'data', 'src', 'scripts', directory, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(text)
+
+
+def drop_script(npc, drops):
+    lines = [f'[ai_queue3,{npc}]', 'gosub(npc_death);', 'def_int $random = random(128);']
+    bound = 0
+    for index, (item, weight, quantity) in enumerate(drops):
+        bound += weight
+        lines.append(('if' if index == 0 else '} else if') + f' ($random < {bound}) {{')
+        lines.append(f'    obj_add(npc_coord, {item}, {quantity}, ^lootdrop_duration);')
+    lines.append('}')
+    return '\n'.join(lines) + '\n'
+
+
+@pytest.fixture
+def revisions(tmp_path, monkeypatch):
+    # Every revision keeps its index next to the working directory.
+    monkeypatch.chdir(tmp_path)
+
+    def load(*trees):
+        roots = []
+        for number, tree in enumerate(trees):
+            root = str(tmp_path / f'rev{number}' / 'Server')
+            for directory, name, text in tree:
+                write_script(root, directory, name, text)
+            roots.append(root)
+        with contextlib.redirect_stdout(io.StringIO()):
+            return load_revisions(roots, workers=1)
+    return load
+
+
+def test_reordered_scripts_are_not_reported(revisions):
+    first = drop_script('goblin', [('bronze_spear', 4, 1), ('coins', 10, 5)])
+    second = drop_script('goblin', [('bones', 3, 1), ('goblin_mail', 2, 1)])
+    old, new = revisions(
+        [('areas', 'goblin.rs2', first), ('drop tables/scripts', 'goblin.rs2', second)],
+        [('areas', 'goblin.rs2', second), ('drop tables/scripts', 'goblin.rs2', first)],
+    )
+    assert old.store.row_records(old.store.rows('goblin')) != new.store.row_records(new.store.rows('goblin'))
+    assert old.diff(new)['monsters'] == []
+
+
+def test_added_removed_and_changed_drops_are_paired_by_item(revisions):
+    old, new = revisions(
+        [
+            ('areas', 'goblin.rs2', drop_script('goblin', [('coins', 10, 5), ('bones', 3, 1), ('bronze_spear', 4, 1)])),
+            ('areas', 'imp.rs2', drop_script('imp', [('ashes', 8, 1)])),
+        ],
+        [
+            ('areas', 'goblin.rs2', drop_script('goblin', [('coins', 10, 8), ('bones', 3, 1), ('goblin_mail', 2, 1)])),
+            ('areas', 'cow.rs2', drop_script('cow', [('cowhide', 64, 1)])),
+        ],
+    )
+    monsters = {owner['name']: owner for owner in old.diff(new)['monsters']}
+    assert {name: owner['status'] for name, owner in monsters.items()} == {'cow': 'added', 'goblin': 'changed', 'imp': 'removed'}
+
+    changes = {change['item']: change for change in monsters['goblin']['changes']}
+    assert {item: change['change'] for item, change in changes.items()} == {'coins': 'changed', 'goblin_mail': 'added', 'bronze_spear': 'removed'}
+    assert (changes['coins']['old_quantity'], changes['coins']['new_quantity']) == ('5', '8')
+    assert changes['coins']['old_rate'] == changes['coins']['new_rate'] == '5/64'
+    assert changes['goblin_mail']['old_rate'] is None and changes['goblin_mail']['new_rate'] == '1/64'
+    assert changes['bronze_spear']['new_rate'] is None and changes['bronze_spear']['old_rate'] == '1/32'
+
+    assert [change['change'] for change in monsters['cow']['changes']] == ['added']
+    assert [change['change'] for change in monsters['imp']['changes']] == ['removed']
@@ -0,0 +1,93 @@
+import contextlib
+import io
+import os
+from fractions import Fraction
+
+import pytest
+
+import loot
+from app import DropParser
+
+GOBLIN_AREA = '''[ai_queue3,goblin]
+gosub(npc_death);
+obj_add(npc_coord, npc_param(death_drop), 1, ^lootdrop_duration);
+def_int $random = random(128);
+if ($random < 10) {
+    obj_add(npc_coord, coins, 5, ^lootdrop_duration);
+} else if ($random < 14) {
+    obj_add(npc_coord, bronze_spear, 1, ^lootdrop_duration);
+} else if ($random < 20) {
+    obj_add(npc_coord, coins, calc(random(4) + 2), ^lootdrop_duration);
+}
+'''
+
+GOBLIN_VARIANT = '''[ai_queue3,goblin]
+gosub(npc_death);
+obj_add(npc_coord, npc_param(death_drop), 1, ^lootdrop_duration);
+def_int $random = random(128);
+if ($random < 64) {
+    obj_add(npc_coord, ashes, 1, ^lootdrop_duration);
+}
+'''
+
+
+@pytest.fixture
+def parser(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    scripts = tmp_path / 'Server' / 'data' / 'src' / 'scripts'
+    for directory, text in (('areas', GOBLIN_AREA), ('drop tables/scripts', GOBLIN_VARIANT)):
+        os.makedirs(scripts / directory)
+        (scripts / directory / 'goblin.rs2').write_text(text)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return DropParser(root='Server')
+
+
+def source(parser, directory):
+    return next(source for source in parser.store.sources('goblin') if os.path.join('scripts', directory, '') in source)
+
+
+def test_each_script_is_its_own_model(parser):
+    assert len(loot.loot_sources(parser, 'goblin')) == 2
+    with pytest.raises(ValueError):
+        loot.LootModel(parser, 'goblin')
+    model = loot.LootModel(parser, 'goblin', source=source(parser, 'areas'))
+    assert sorted(model.items()) == ['bronze_spear', 'coins', 'default_drop']
+
+
+def test_drop_chances(parser):
+    area = loot.LootModel(parser, 'goblin', source=source(parser, 'areas'))
+    assert area.drop_chances() == {'default_drop': 1, 'coins': Fraction(16, 128), 'bronze_spear': Fraction(4, 128)}
+    variant = loot.LootModel(parser, 'goblin', source=source(parser, 'drop tables/scripts'))
+    assert variant.drop_chances() == {'default_drop': 1, 'ashes': Fraction(1, 2)}
+
+
+def test_expected_quantities(parser):
+    area = loot.LootModel(parser, 'goblin', source=source(parser, 'areas'))
+    # random(4) + 2 gives 2 to 5 coins, 3.5 on average.
+    assert area.expected_quantities() == {
+        'default_drop': 1,
+        'coins': Fraction(10, 128) * 5 + Fraction(6, 128) * Fraction(7, 2),
+        'bronze_spear': Fraction(4, 128),
+    }
+
+
+def test_kills_for_chance():
+    assert loot.kills_for_chance(1 / 128, 0.5) == 89
+    assert [loot.kills_for_chance(1 / 8, chance) for chance in loot.KILL_CHANCES] == [6, 18, 35]
+    # At least two drops at 1/2 a kill: 1 - (n + 1) / 2^n first reaches 90% at 7 kills.
+    assert loot.kills_for_chance(0.5, 0.9, 2) == 7
+    assert loot.kills_for_chance(1, 0.99, 3) == 3
+    assert loot.kills_for_chance(0, 0.5) is None
+
+
+def test_loot_report_and_simulation_are_per_script(parser):
+    reports = [loot.loot_report(parser, 'goblin', kills=100, source=path) for path in loot.loot_sources(parser, 'goblin')]
+    assert [report['source'] for report in reports] == loot.loot_sources(parser, 'goblin')
+    for report in reports:
+        default_drop = next(entry for entry in report['items'] if entry['item'] == 'default_drop')
+        assert default_drop['expected'] == 100
+
+    pytest.importorskip('numpy')
+    targets = [('goblin', path) for path in loot.loot_sources(parser, 'goblin')]
+    for result in loot.simulate_loot(parser, targets, kills=100, seed=1):
+        assert result['items']['default_drop'] == {'total': 100, 'drops': 100, 'per_kill': 1.0}
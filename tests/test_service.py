@@ -0,0 +1,113 @@
+import asyncio
+import contextlib
+import http.client
+import io
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from app import DropParser, DropService
+from benchmarks.corpus import generate_corpus
+
+
+@pytest.fixture(scope="module")
+def service(tmp_path_factory):
+    root = str(tmp_path_factory.mktemp("corpus") / "Server")
+    generate_corpus(root, files=200, seed=7)
+    with contextlib.redirect_stdout(io.StringIO()):
+        parser = DropParser(index_path=os.path.join(os.path.dirname(root), "drop_index.json"), root=root)
+    service = DropService(parser)
+
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        serving = asyncio.run_coroutine_threadsafe(service.serve("127.0.0.1", 0), loop)
+        deadline = time.monotonic() + 10
+        while service.address is None and not serving.done() and time.monotonic() < deadline:
+            time.sleep(0.01)
+    assert service.address is not None, "server did not start"
+    yield service
+
+    asyncio.run_coroutine_threadsafe(cancel_tasks(), loop).result(timeout=5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(timeout=5)
+    loop.run_until_complete(loop.shutdown_default_executor())
+    loop.close()
+
+
+async def cancel_tasks():
+    # Cancel the server and any open connections and let them finish before the loop stops.
+    tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def request(service, method, target, headers=None):
+    connection = http.client.HTTPConnection(*service.address, timeout=10)
+    try:
+        connection.request(method, target, headers=headers or {})
+        response = connection.getresponse()
+        return response, response.read()
+    finally:
+        connection.close()
+
+
+def test_monster_query_returns_json_with_etag(service):
+    response, body = request(service, "GET", "/monster?q=goblin")
+    assert response.status == 200
+    assert response.getheader("Content-Type") == "application/json"
+    assert response.getheader("ETag") == f'"{service.parser.data_version}"'
+    result = json.loads(body)
+    assert result["kind"] == "monster"
+    assert result["query"] == "goblin"
+
+
+def test_matching_etag_returns_not_modified(service):
+    response, _ = request(service, "GET", "/item?q=coins")
+    etag = response.getheader("ETag")
+    response, body = request(service, "GET", "/item?q=coins", {"If-None-Match": etag})
+    assert response.status == 304
+    assert body == b""
+    assert response.getheader("ETag") == etag
+
+
+def test_missing_query_is_bad_request(service):
+    response, body = request(service, "GET", "/monster")
+    assert response.status == 400
+    assert "error" in json.loads(body)
+
+
+def test_unknown_path_is_not_found(service):
+    response, _ = request(service, "GET", "/nowhere")
+    assert response.status == 404
+
+
+def test_other_methods_are_not_allowed(service):
+    response, _ = request(service, "POST", "/tables")
+    assert response.status == 405
+    assert response.getheader("Allow") == "GET, HEAD"
+
+
+def test_head_returns_headers_without_body(service):
+    response, body = request(service, "HEAD", "/tables")
+    assert response.status == 200
+    assert int(response.getheader("Content-Length")) > 0
+    assert body == b""
+
+
+def test_waiting_on_the_parser_does_not_block_other_clients(service):
+    # A reload holding the lock stalls lookups, but the event loop keeps serving other requests.
+    with service.parser.lock:
+        blocked = threading.Thread(target=request, args=(service, "GET", "/monster?q=dragon"))
+        blocked.start()
+        time.sleep(0.1)
+        response, _ = request(service, "GET", "/nowhere")
+        assert response.status == 404
+        assert blocked.is_alive()
+    blocked.join(timeout=10)
+    assert not blocked.is_alive()